@@ -12,6 +12,11 @@ import re
 import ruamel.yaml
 import yaml
 from ansible.plugins.action import ActionBase
+from ansible_collections.ansible.content_builder.plugins.plugin_utils.cloud_utils.utils import (
+    OutputFiles,
+    profiler,
+    profiling,
+)
 
 
 class MissingDependency(Exception):
@@ -202,7 +207,9 @@ def flatten_module_examples(tasks: List[TaskType]) -> str:
 
 def inject(
     target_dir: Path, extracted_examples: Dict[str, Dict[str, List[Dict[str, Any]]]]
-) -> None:
+) -> List[str]:
+    """Update the EXAMPLES block of the modules, return the files that changed."""
+    output = OutputFiles(target_dir)
     module_dir = target_dir / "plugins" / "modules"
     for module_fqcn in extracted_examples:
         module_name = module_fqcn.split(".")[-1]
@@ -210,33 +217,40 @@ def inject(
         if module_path.is_symlink():
             continue
 
-        examples_section_to_inject = flatten_module_examples(
-            extracted_examples[module_fqcn]["blocks"]
+        with profiler.resource(module_name):
+            inject_examples(module_path, extracted_examples[module_fqcn]["blocks"], output)
+    return output.changed
+
+
+def inject_examples(module_path: Path, blocks: List[Dict[str, Any]], output: OutputFiles) -> None:
+    """Replace the EXAMPLES block of a module with the given tasks."""
+    examples_section_to_inject = flatten_module_examples(blocks)
+    new_content = ""
+    in_examples_block = False
+    closing_pattern = None
+    for l in module_path.read_text().split("\n"):
+        if m := re.search(r"^EXAMPLES\s+=\s+(|r)('{3}|\"{3})$", l):
+            closing_pattern = m.group(2)
+            in_examples_block = True
+            new_content += l + "\n" + examples_section_to_inject.lstrip("\n")
+        elif closing_pattern and l == closing_pattern:
+            in_examples_block = False
+            new_content += l + "\n"
+        elif in_examples_block:
+            continue
+        else:
+            new_content += l + "\n"
+    if in_examples_block:
+        raise ContentInjectionFailure(
+            "The closing of the EXAMPLES block was not found."
         )
-        new_content = ""
-        in_examples_block = False
-        closing_pattern = None
-        for l in module_path.read_text().split("\n"):
-            if m := re.search(r"^EXAMPLES\s+=\s+(|r)('{3}|\"{3})$", l):
-                closing_pattern = m.group(2)
-                in_examples_block = True
-                new_content += l + "\n" + examples_section_to_inject.lstrip("\n")
-            elif closing_pattern and l == closing_pattern:
-                in_examples_block = False
-                new_content += l + "\n"
-            elif in_examples_block:
-                continue
-            else:
-                new_content += l + "\n"
-        if in_examples_block:
-            raise ContentInjectionFailure(
-                "The closing of the EXAMPLES block was not found."
-            )
-        if closing_pattern is None:
-            raise ContentInjectionFailure("The EXAMPLES block was not updated.")
-        new_content = new_content.rstrip("\n") + "\n"
-        print(f"Updating {module_name}")
-        module_path.write_text(new_content)
+    if closing_pattern is None:
+        raise ContentInjectionFailure("The EXAMPLES block was not updated.")
+    new_content = new_content.rstrip("\n") + "\n"
+    with profiler.stage("write"):
+        changed = output.write(module_path, new_content)
+    if changed:
+        print(f"Updating {module_path.stem}")
 
 
 class ActionModule(ActionBase):
@@ -268,6 +282,12 @@ class ActionModule(ActionBase):
         self._task_vars = task_vars
         args = self._task.args
 
+        with profiling(args, self._result):
+            self._result["changed_files"] = self.generate_examples(args, task_vars)
+        self._result["changed"] = bool(self._result["changed_files"])
+        return self._result
+
+    def generate_examples(self, args, task_vars):
         galaxy_file = args.get("target_dir") + "/galaxy.yml"
         galaxy = yaml.safe_load(Path(galaxy_file).open())
         vars_file = task_vars['vars']['role_path'] + "/vars/main.yaml"
@@ -278,19 +298,20 @@ class ActionModule(ActionBase):
             Path(args.get("target_dir")) / Path(i)
             for i in vars["module_openapi_cloud__examples"][collection_name]["load_from"]
         ]
-        for scenario_dir in test_scenarios_dirs:
-            if not scenario_dir.is_dir():
-                continue
-            if scenario_dir.name.startswith("setup_"):
-                continue
-            task_dir = scenario_dir / "tasks"
-            tasks += get_tasks(task_dir)
-
-        extracted_examples = extract(
-            tasks,
-            collection_name,
-            dont_look_up_vars=vars["module_openapi_cloud__examples"][collection_name]["dont_look_up_vars"],
-            task_selector=vars["module_openapi_cloud__examples"][collection_name]["task_selector"],
-        )
-        inject(Path(args.get("target_dir")), extracted_examples)
-        return self._result
+        with profiler.stage("task load"):
+            for scenario_dir in test_scenarios_dirs:
+                if not scenario_dir.is_dir():
+                    continue
+                if scenario_dir.name.startswith("setup_"):
+                    continue
+                task_dir = scenario_dir / "tasks"
+                tasks += get_tasks(task_dir)
+
+        with profiler.stage("example extraction"):
+            extracted_examples = extract(
+                tasks,
+                collection_name,
+                dont_look_up_vars=vars["module_openapi_cloud__examples"][collection_name]["dont_look_up_vars"],
+                task_selector=vars["module_openapi_cloud__examples"][collection_name]["task_selector"],
+            )
+        return inject(Path(args.get("target_dir")), extracted_examples)
@@ -3,11 +3,19 @@
 # (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
 
 import pathlib
+from typing import List
 
 from ansible.plugins.action import ActionBase
+from ansible_collections.ansible.content_builder.plugins.plugin_utils.cloud_utils.utils import (
+    OutputFiles,
+    profiler,
+    profiling,
+)
 
 
-def refresh_ignore_files(target_dir):
+def refresh_ignore_files(target_dir) -> List[str]:
+    """Write the tests/sanity/ignore-*.txt files, return the ones that changed."""
+    output = OutputFiles(target_dir)
     module_utils_directory = pathlib.Path(target_dir +  "/plugins/module_utils")
     plugin_utils_directory = pathlib.Path(target_dir + "/plugins/plugin_utils")
     module_directory = pathlib.Path(target_dir + "/plugins/modules")
@@ -20,7 +28,7 @@ def refresh_ignore_files(target_dir):
         # return the relative path (rp) of the file inside the collection
         return pathlib.Path(*pathlib.Path(m).parts[-3:])
 
-    with ignore_file("2.9").open("w") as f:
+    with output.open(ignore_file("2.9")) as f:
         f.write(
             "plugins/modules/vcenter_vm_guest_customization.py pep8!skip\n"
         )  # E501: line too long (189 > 160 characters)
@@ -56,7 +64,7 @@ def refresh_ignore_files(target_dir):
             f.write(f"{rp(m)} compile-2.7!skip\n")
             f.write(f"{rp(m)} compile-3.5!skip\n")
 
-    with ignore_file("2.10").open("w") as f:
+    with output.open(ignore_file("2.10")) as f:
         f.write(
             "plugins/modules/vcenter_vm_guest_customization.py pep8!skip\n"
         )  # E501: line too long (189 > 160 characters)
@@ -92,7 +100,7 @@ def refresh_ignore_files(target_dir):
             f.write(f"{rp(m)} compile-2.7!skip\n")
             f.write(f"{rp(m)} compile-3.5!skip\n")
 
-    with ignore_file("2.11").open("w") as f:
+    with output.open(ignore_file("2.11")) as f:
         f.write(
             "plugins/modules/vcenter_vm_guest_customization.py pep8!skip\n"
         )  # E501: line too long (189 > 160 characters)
@@ -134,7 +142,7 @@ def refresh_ignore_files(target_dir):
             f.write(f"{rp(m)} import-3.5!skip\n")
             f.write(f"{rp(m)} compile-3.5!skip\n")
 
-    with ignore_file("2.12").open("w") as f:
+    with output.open(ignore_file("2.12")) as f:
         f.write(
             "plugins/modules/vcenter_vm_guest_customization.py pep8!skip\n"
         )  # E501: line too long (189 > 160 characters)
@@ -146,7 +154,7 @@ def refresh_ignore_files(target_dir):
         for m in lookup_directory.glob("*.py"):
             pass
 
-    with ignore_file("2.13").open("w") as f:
+    with output.open(ignore_file("2.13")) as f:
         f.write(
             "plugins/modules/vcenter_vm_guest_customization.py pep8!skip\n"
         )  # E501: line too long (189 > 160 characters)
@@ -160,7 +168,7 @@ def refresh_ignore_files(target_dir):
         for m in module_utils_directory.glob("*.py"):
             pass
 
-    with ignore_file("2.14").open("w") as f:
+    with output.open(ignore_file("2.14")) as f:
         f.write(
             "plugins/modules/vcenter_vm_guest_customization.py pep8!skip\n"
         )  # E501: line too long (189 > 160 characters)
@@ -174,7 +182,7 @@ def refresh_ignore_files(target_dir):
         for m in module_utils_directory.glob("*.py"):
             pass
 
-    with ignore_file("2.15").open("w") as f:
+    with output.open(ignore_file("2.15")) as f:
         f.write(
             "plugins/modules/vcenter_vm_guest_customization.py pep8!skip\n"
         )  # E501: line too long (189 > 160 characters)
@@ -188,6 +196,8 @@ def refresh_ignore_files(target_dir):
         for m in module_utils_directory.glob("*.py"):
             pass
 
+    return output.changed
+
 
 class ActionModule(ActionBase):
 
@@ -218,6 +228,8 @@ class ActionModule(ActionBase):
         self._task_vars = task_vars
 
         args = self._task.args
-        refresh_ignore_files(target_dir=args.get("target_dir"))
+        with profiling(args, self._result), profiler.stage("write"):
+            self._result["changed_files"] = refresh_ignore_files(target_dir=args.get("target_dir"))
+        self._result["changed"] = bool(self._result["changed_files"])
 
         return self._result
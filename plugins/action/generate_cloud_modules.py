@@ -15,12 +15,18 @@ __metaclass__ = type
 
 import argparse
 import json
+import multiprocessing
+import traceback
+import warnings
 
 import pathlib
 import re
 import yaml
 import copy
-from typing import Dict, Iterable, List, DefaultDict, Union, Optional, TypeVar, Type
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, DefaultDict, Set, Tuple, Union, Optional, TypeVar, Type
+from ansible.module_utils.parsing.convert_bool import boolean
 from ansible.plugins.action import ActionBase
 from ansible_collections.ansible.content_builder.plugins.plugin_utils.cloud_utils.content_library_data import content_library_static_ds
 from ansible_collections.ansible.content_builder.plugins.plugin_utils.cloud_utils.utils import (
@@ -29,10 +35,19 @@ from ansible_collections.ansible.content_builder.plugins.plugin_utils.cloud_util
     UtilsBase,
     jinja2_renderer,
     get_module_added_ins,
-    get_module_from_config,
+    get_modules_history,
+    get_cache_dir,
+    BuildManifest,
+    ModuleConfig,
+    OutputFiles,
+    load_schema,
+    fingerprint,
+    hash_files,
     python_type,
     camel_to_snake,
-    ignore_description,
+    format_argument_spec,
+    profiler,
+    profiling,
 )
 # import for amazon.cloud doc generation
 from ansible_collections.ansible.content_builder.plugins.plugin_utils.cloud_utils.generator import generate_documentation
@@ -330,7 +345,7 @@ def gen_documentation(
         documentation["options"][normalized_name] = option
         parameter["added_in"] = next_version
 
-    module_from_config = get_module_from_config(name, target_dir)
+    module_from_config = ModuleConfig.load(target_dir).get(name)
     if module_from_config and "documentation" in module_from_config:
         for k, v in module_from_config["documentation"].items():
             documentation[k] = v
@@ -400,7 +415,7 @@ def gen_cisco_intersight_documentation(
         "version_added": next_version,
     }
 
-    module_from_config = get_module_from_config(name, target_dir)
+    module_from_config = ModuleConfig.load(target_dir).get(name)
     if module_from_config and "documentation" in module_from_config:
         for k, v in module_from_config["documentation"].items():
             documentation[k] = v
@@ -451,42 +466,37 @@ def path_to_name(path: str) -> str:
 
 
 def gen_arguments_py(parameters: List, list_index=None) -> str:
-    result = ""
+    options = []
     for parameter in parameters:
         name = normalize_parameter_name(parameter["name"])
-        values = []
+        spec = {}
 
         if name in ["user_name", "username", "encryption_key", "client_token"]:
-            values.append("'no_log': True")
+            spec["no_log"] = True
         elif "password" in name:
-            values.append("'no_log': True")
+            spec["no_log"] = True
 
         if parameter.get("required"):
-            values.append("'required': True")
+            spec["required"] = True
 
         aliases = parameter.get("aliases")
         if aliases:
-            values.append(f"'aliases': {aliases}")
+            spec["aliases"] = aliases
 
-        _type = python_type(parameter["type"])
-        values.append(f"'type': '{_type}'")
+        spec["type"] = python_type(parameter["type"])
         if "enum" in parameter:
-            choices = ", ".join([f"'{i}'" for i in sorted(parameter["enum"])])
-            values.append(f"'choices': [{choices}]")
-        if python_type(parameter["type"]) == "list":
-            _elements = python_type(parameter["elements"])
-            values.append(f"'elements': '{_elements}'")
+            spec["choices"] = [str(i) for i in sorted(parameter["enum"])]
+        if spec["type"] == "list":
+            spec["elements"] = python_type(parameter["elements"])
 
         # "bus" option defaulting on 0
         if name == "bus":
-            values.append("'default': 0")
+            spec["default"] = 0
         elif "default" in parameter:
-            default = parameter["default"]
-            values.append(f"'default': '{default}'")
+            spec["default"] = str(parameter["default"])
 
-        result += f"\nargument_spec['{name}'] = "
-        result += "{" + ", ".join(values) + "}"
-    return result
+        options.append((name, spec))
+    return format_argument_spec(options)
 
 
 def flatten_ref(tree: any, definitions: Iterable) -> any:
@@ -496,26 +506,7 @@ def flatten_ref(tree: any, definitions: Iterable) -> any:
         return definitions.get(tree)
     if isinstance(tree, list):
         return [flatten_ref(i, definitions) for i in tree]
-    if tree is None:
-        return {}
-    for k in tree:
-        v = tree[k]
-        if k == "$ref":
-            dotted = v.split("/")[2]
-            if dotted in ["vapi.std.localization_param", "VapiStdLocalizationParam"]:
-                # to avoid an endless loop with
-                # vapi.std.nested_localizable_message
-                return {"go_to": "vapi.std.localization_param"}
-            definition = definitions.get(dotted)
-            data = flatten_ref(definition, definitions)
-            if "description" not in data and "description" in tree:
-                data["description"] = tree["description"]
-            return data
-        elif isinstance(v, dict):
-            tree[k] = flatten_ref(v, definitions)
-        else:
-            pass
-    return tree
+    return definitions.flatten(tree)
 
 
 class Resource:
@@ -527,14 +518,10 @@ class Resource:
 
 # amazon.cloud specific
 def generate_params(definitions: Iterable) -> str:
-    params: str = ""
     keys = sorted(
         definitions.keys() - ["wait", "wait_timeout", "state", "purge_tags", "force"]
     )
-    for key in keys:
-        params += f"\nparams['{key}'] = module.params.get('{key}')"
-
-    return params
+    return "".join(f"\nparams['{key}'] = module.params.get('{key}')" for key in keys)
 
 
 def gen_mutually_exclusive(schema: Dict) -> List:
@@ -562,20 +549,22 @@ def ensure_all_identifiers_defined(schema: Dict) -> str:
     return new_content
 
 
-def generate_argument_spec(options: Dict) -> str:
-    argument_spec: str = ""
-    options_copy = copy.deepcopy(options)
-
-    for key in options_copy.keys():
-        ignore_description(options_copy[key])
+def argument_spec_option(option: any) -> any:
+    """Return the argument spec of an option from its documentation.
 
-    for key in options_copy.keys():
-        argument_spec += f"\nargument_spec['{key}'] = "
-        argument_spec += str(options_copy[key])
+    The descriptions are left out, and the suboptions become options.
+    """
+    if not isinstance(option, dict):
+        return option
+    return {
+        "options" if k == "suboptions" else k: argument_spec_option(v)
+        for k, v in option.items()
+        if k != "description" or isinstance(v, dict)
+    }
 
-    argument_spec = argument_spec.replace("suboptions", "options")
 
-    return argument_spec
+def generate_argument_spec(options: Dict) -> str:
+    return format_argument_spec((key, argument_spec_option(option)) for key, option in options.items())
 
 
 # common procs
@@ -620,6 +609,26 @@ def gen_required_if(schema: Union[List, Dict]) -> List:
     return entries
 
 
+def git_history_location(target_dir: str) -> Tuple[str, str]:
+    """Return the git dir of the collection and the cache file of its history."""
+    git_dir = str(pathlib.Path(target_dir + "/.git"))
+    return git_dir, str(get_cache_dir(target_dir) / "version_added.json")
+
+
+def swagger_build_inputs(module: any, module_dir: str) -> Dict:
+    """The part of the swagger file a vmware_rest or intersight module is built from."""
+    operations = module.resource.operations
+    config = ModuleConfig.load(module_dir)
+    return {
+        "operations": operations,
+        "summary": module.resource.summary,
+        "definitions": module.definitions.fragment(operations),
+        "answer": sorted(module.answer() or []),
+        "default_operationIds": sorted(module.default_operationIds),
+        "config": config.get(module.name) if module.name in config else None,
+    }
+
+
 # Classes
 class AnsibleModuleBaseAmazon(UtilsBase):
     template_file = "default_module.j2"
@@ -634,38 +643,54 @@ class AnsibleModuleBaseAmazon(UtilsBase):
         list_to_str = "".join(map(str, splitted[2:]))
         return prefix + "_" + camel_to_snake(list_to_str)
 
+    def build_inputs(self, target_dir: str, module_dir: str) -> Dict:
+        git_dir, cache_file = git_history_location(target_dir)
+        return {
+            "schema": self.schema,
+            "config": ModuleConfig.load(module_dir).get(self.name),
+            "added_ins": get_module_added_ins(self.name, git_dir=git_dir, cache_file=cache_file),
+        }
+
     def renderer(self, target_dir: str, module_dir: str, next_version: str, role_path: str):
-        added_ins = get_module_added_ins(self.name, git_dir=pathlib.Path(target_dir + "/.git"))
-        documentation = generate_documentation(
-            self,
-            added_ins,
-            next_version,
-            module_dir,
-        )
+        with profiler.stage("git history"):
+            git_dir, cache_file = git_history_location(target_dir)
+            added_ins = get_module_added_ins(self.name, git_dir=git_dir, cache_file=cache_file)
+        with profiler.stage("doc build"):
+            documentation = generate_documentation(
+                self,
+                added_ins,
+                next_version,
+                module_dir,
+            )
 
-        arguments = generate_argument_spec(documentation["options"])
-        documentation_to_string = format_documentation(documentation)
-
-        content = jinja2_renderer(
-            self.template_file,
-            role_path,
-            "amazon_cloud",
-            arguments=indent(arguments, 4),
-            documentation=documentation_to_string,
-            name=self.name,
-            resource_type=f"'{self.schema.get('typeName')}'",
-            params=indent(generate_params(documentation["options"]), 4),
-            primary_identifier=self.schema["primaryIdentifier"],
-            required_if=gen_required_if(self.schema),
-            mutually_exclusive=gen_mutually_exclusive(self.schema),
-            ensure_all_identifiers_defined=ensure_all_identifiers_defined(self.schema)
-            if len(self.schema["primaryIdentifier"]) > 1
-            else "",
-            create_only_properties=self.schema.get("createOnlyProperties", {}),
-            handlers=list(self.schema.get("handlers", {}).keys()),
-        )
+        with profiler.stage("parameter build"):
+            arguments = generate_argument_spec(documentation["options"])
+            params = generate_params(documentation["options"])
+        with profiler.stage("doc build"):
+            documentation_to_string = format_documentation(documentation)
+
+        with profiler.stage("template render"):
+            content = jinja2_renderer(
+                self.template_file,
+                role_path,
+                "amazon_cloud",
+                target_dir,
+                arguments=indent(arguments, 4),
+                documentation=documentation_to_string,
+                name=self.name,
+                resource_type=f"'{self.schema.get('typeName')}'",
+                params=indent(params, 4),
+                primary_identifier=self.schema["primaryIdentifier"],
+                required_if=gen_required_if(self.schema),
+                mutually_exclusive=gen_mutually_exclusive(self.schema),
+                ensure_all_identifiers_defined=ensure_all_identifiers_defined(self.schema)
+                if len(self.schema["primaryIdentifier"]) > 1
+                else "",
+                create_only_properties=self.schema.get("createOnlyProperties", {}),
+                handlers=list(self.schema.get("handlers", {}).keys()),
+            )
 
-        self.write_module(target_dir, content)
+        return self.write_module(target_dir, content)
 
 
 class AnsibleModuleBaseVmware(UtilsBase):
@@ -678,6 +703,7 @@ class AnsibleModuleBaseVmware(UtilsBase):
         self.default_operationIds = set(list(self.resource.operations.keys())) - set(
             ["get", "list"]
         )
+        self._parameters = None
 
     def description(self) -> str:
         prefered_operationId = ["get", "list", "create", "get", "set"]
@@ -759,6 +785,20 @@ class AnsibleModuleBaseVmware(UtilsBase):
             return raw_answer["properties"].keys()
 
     def parameters(self) -> Iterable:
+        """Return the module parameters, built once per instance.
+
+        The renderer passes the same list to gen_arguments_py, gen_documentation
+        and gen_required_if. Call invalidate_parameters() after changing
+        the resource or the default_operationIds.
+        """
+        if self._parameters is None:
+            self._parameters = self._build_parameters()
+        return self._parameters
+
+    def invalidate_parameters(self) -> None:
+        self._parameters = None
+
+    def _build_parameters(self) -> Iterable:
         def sort_operationsid(input: Iterable) -> Iterable:
             output = sorted(input)
             if "create" in output:
@@ -1010,38 +1050,47 @@ class AnsibleModuleBaseVmware(UtilsBase):
 
         return list_path
 
+    def build_inputs(self, target_dir: str, module_dir: str) -> Dict:
+        return swagger_build_inputs(self, module_dir)
+
     def renderer(self, target_dir: str, module_dir: str, next_version: str, role_path: str):
 
         added_ins = {}  # get_module_added_ins(self.name, git_dir=target_dir / ".git")
-        arguments = gen_arguments_py(self.parameters(), self.list_index())
-        documentation = format_documentation(
-            gen_documentation(
-                self.name,
-                self.description(),
-                self.parameters(),
-                added_ins,
-                next_version,
-                module_dir,
+        with profiler.stage("parameter build"):
+            parameters = self.parameters()
+            arguments = gen_arguments_py(parameters, self.list_index())
+        with profiler.stage("doc build"):
+            documentation = format_documentation(
+                gen_documentation(
+                    self.name,
+                    self.description(),
+                    parameters,
+                    added_ins,
+                    next_version,
+                    module_dir,
+                )
+            )
+        with profiler.stage("parameter build"):
+            required_if = gen_required_if(parameters)
+
+        with profiler.stage("template render"):
+            content = jinja2_renderer(
+                self.template_file,
+                role_path,
+                "vmware_rest",
+                target_dir,
+                arguments=indent(arguments, 4),
+                documentation=documentation,
+                list_index=self.list_index(),
+                list_path=self.list_path(),
+                name=self.name,
+                operations=self.resource.operations,
+                path=self.get_path(),
+                payload_format=self.payload(),
+                required_if=required_if,
             )
-        )
-        required_if = gen_required_if(self.parameters())
-
-        content = jinja2_renderer(
-            self.template_file,
-            role_path,
-            "vmware_rest",
-            arguments=indent(arguments, 4),
-            documentation=documentation,
-            list_index=self.list_index(),
-            list_path=self.list_path(),
-            name=self.name,
-            operations=self.resource.operations,
-            path=self.get_path(),
-            payload_format=self.payload(),
-            required_if=required_if,
-        )
 
-        self.write_module(target_dir, content)
+        return self.write_module(target_dir, content)
 
 
 class AnsibleModuleBaseCiscoIntersight(UtilsBase):
@@ -1054,6 +1103,7 @@ class AnsibleModuleBaseCiscoIntersight(UtilsBase):
         self.default_operationIds = set(list(self.resource.operations.keys())) - set(
             ["get", "list"]
         )
+        self._parameters = None
 
     def description(self) -> str:
         prefered_operationId = ["get", "list", "create", "get", "set"]
@@ -1135,6 +1185,20 @@ class AnsibleModuleBaseCiscoIntersight(UtilsBase):
             return raw_answer["properties"].keys()
 
     def parameters(self) -> Iterable:
+        """Return the module parameters, built once per instance.
+
+        The renderer passes the same list to gen_arguments_py, gen_documentation
+        and gen_required_if. Call invalidate_parameters() after changing
+        the resource or the default_operationIds.
+        """
+        if self._parameters is None:
+            self._parameters = self._build_parameters()
+        return self._parameters
+
+    def invalidate_parameters(self) -> None:
+        self._parameters = None
+
+    def _build_parameters(self) -> Iterable:
         def sort_operationsid(input: Iterable) -> Iterable:
             output = sorted(input)
             if "create" in output:
@@ -1386,38 +1450,47 @@ class AnsibleModuleBaseCiscoIntersight(UtilsBase):
 
         return list_path
 
+    def build_inputs(self, target_dir: str, module_dir: str) -> Dict:
+        return swagger_build_inputs(self, module_dir)
+
     def renderer(self, target_dir: str, module_dir: str, next_version: str, role_path: str):
 
         added_ins = {}  # get_module_added_ins(self.name, git_dir=target_dir / ".git")
-        arguments = gen_arguments_py(self.parameters(), self.list_index())
-        documentation = format_documentation(
-            gen_cisco_intersight_documentation(
-                self.name,
-                self.description(),
-                self.parameters(),
-                added_ins,
-                next_version,
-                module_dir,
+        with profiler.stage("parameter build"):
+            parameters = self.parameters()
+            arguments = gen_arguments_py(parameters, self.list_index())
+        with profiler.stage("doc build"):
+            documentation = format_documentation(
+                gen_cisco_intersight_documentation(
+                    self.name,
+                    self.description(),
+                    parameters,
+                    added_ins,
+                    next_version,
+                    module_dir,
+                )
+            )
+        with profiler.stage("parameter build"):
+            required_if = gen_required_if(parameters)
+
+        with profiler.stage("template render"):
+            content = jinja2_renderer(
+                self.template_file,
+                role_path,
+                "cisco_intersight",
+                target_dir,
+                arguments=indent(arguments, 4),
+                documentation=documentation,
+                list_index=self.list_index(),
+                list_path=self.list_path(),
+                name=self.name,
+                operations=self.resource.operations,
+                path=self.get_path(),
+                payload_format=self.payload(),
+                required_if=required_if,
             )
-        )
-        required_if = gen_required_if(self.parameters())
-
-        content = jinja2_renderer(
-            self.template_file,
-            role_path,
-            "cisco_intersight",
-            arguments=indent(arguments, 4),
-            documentation=documentation,
-            list_index=self.list_index(),
-            list_path=self.list_path(),
-            name=self.name,
-            operations=self.resource.operations,
-            path=self.get_path(),
-            payload_format=self.payload(),
-            required_if=required_if,
-        )
 
-        self.write_module(target_dir, content)
+        return self.write_module(target_dir, content)
 
 
 
@@ -1427,8 +1500,8 @@ class AnsibleInfoModule(AnsibleModuleBaseVmware):
         self.name = resource.name + "_info"
         self.default_operationIds = ["get", "list"]
 
-    def parameters(self) -> List:
-        return [i for i in list(super().parameters()) if i["name"] != "state"]
+    def _build_parameters(self) -> List:
+        return [i for i in list(super()._build_parameters()) if i["name"] != "state"]
 
 
 class AnsibleInfoNoListModule(AnsibleInfoModule):
@@ -1440,27 +1513,197 @@ class AnsibleInfoListOnlyModule(AnsibleInfoModule):
 
 
 class Definitions:
-    def __init__(self, data: any):
+    def __init__(self, data: any, cyclic: Optional[Dict[str, bool]] = None):
         super().__init__()
         self.definitions = data
+        # dotted name -> definition with its $ref flattened, shared by the
+        # trees that refer to it and never handed out as is
+        self._resolved = {}
+        # dotted name -> whether the definition refers back to itself, see
+        # find_cycles()
+        self._cyclic = dict(cyclic or {})
+
+    @staticmethod
+    def dotted(ref: str) -> str:
+        """Return the name of the definition, relative to the definitions.
+
+        e.g: vcenter.VM for #/definitions/vcenter.VM, or schemas/server.Profile
+        for #/components/schemas/server.Profile
+        """
+        return ref.split("/", 2)[2]
+
+    def _lookup(self, dotted: str) -> any:
+        definition = self.definitions
+        for name in dotted.split("/"):
+            definition = definition[name]
+        return definition
 
     def get(self, ref: any) -> any:
         if isinstance(ref, dict):
             # TODO: standardize the input to avoid this step
-            dotted = ref["$ref"].split("/")[2]
+            dotted = self.dotted(ref["$ref"])
         else:
             dotted = ref
 
         try:
-            definition = self.definitions[dotted]
+            definition = self._lookup(dotted)
         except KeyError:
-            definition = self.definitions["com.vmware." + dotted]
+            definition = self._lookup("com.vmware." + dotted)
 
         if definition is None:
             raise Exception("Cannot find ref for {ref}")
 
         return definition
 
+    def fragment(self, tree: any) -> Dict:
+        """Return the definitions tree refers to, directly or not."""
+        result = {}
+        pending = [tree]
+        while pending:
+            node = pending.pop()
+            if isinstance(node, (list, tuple)):
+                pending.extend(node)
+            elif isinstance(node, dict):
+                ref = node.get("$ref")
+                if isinstance(ref, str):
+                    dotted = self.dotted(ref)
+                    if dotted not in result:
+                        result[dotted] = self.get(dotted)
+                        pending.append(result[dotted])
+                pending.extend(node.values())
+        return result
+
+    def resolve(self, dotted: str) -> Dict:
+        """Return the definition with all its $ref flattened.
+
+        The result is a copy, the caller can modify it without altering
+        the other modules using the same definition.
+        """
+        return _copy_tree(self._resolve(dotted))
+
+    def flatten(self, tree: any) -> any:
+        """Return a copy of tree where the $ref are replaced by their definition."""
+        return _copy_tree(self._flatten(tree))
+
+    def is_cyclic(self, dotted: str) -> bool:
+        """Return if the definition refers back to itself, directly or not.
+
+        The strongly connected components of the $ref graph are computed
+        (Tarjan) from the definition, only the definitions it can reach
+        are read.
+        """
+        if dotted not in self._cyclic:
+            self._find_cycles(dotted)
+        return self._cyclic[dotted]
+
+    def find_cycles(self, tree: any) -> Dict[str, bool]:
+        """Return whether each definition tree refers to, directly or not, is cyclic.
+
+        The result can be stored and given back to Definitions() to skip the
+        search.
+        """
+        pending = [tree]
+        while pending:
+            node = pending.pop()
+            if isinstance(node, (list, tuple)):
+                pending.extend(node)
+            elif isinstance(node, Mapping):
+                ref = node.get("$ref")
+                if isinstance(ref, str):
+                    self.is_cyclic(self.dotted(ref))
+                pending.extend(node.values())
+        return dict(sorted(self._cyclic.items()))
+
+    def _refs(self, tree: any) -> Set[str]:
+        # the $ref that _flatten() follows
+        if "$ref" in tree:
+            return {self.dotted(tree["$ref"])}
+        refs = set()
+        for v in tree.values():
+            if isinstance(v, dict):
+                refs.update(self._refs(v))
+        return refs
+
+    def _successors(self, dotted: str) -> List[str]:
+        try:
+            definition = self.get(dotted)
+        except KeyError:
+            # _flatten() reports it, if the definition is ever flattened
+            return []
+        return sorted(self._refs(definition or {}))
+
+    def _find_cycles(self, root: str) -> None:
+        index = {}
+        lowlink = {}
+        stack = []
+        on_stack = set()
+        pending = [(root, None)]
+        while pending:
+            dotted, successors = pending.pop()
+            if successors is None:
+                index[dotted] = lowlink[dotted] = len(index)
+                stack.append(dotted)
+                on_stack.add(dotted)
+                successors = iter(self._successors(dotted))
+            for successor in successors:
+                if successor in self._cyclic:
+                    # part of a component found by a previous search
+                    continue
+                if successor not in index:
+                    pending.append((dotted, successors))
+                    pending.append((successor, None))
+                    break
+                if successor in on_stack:
+                    lowlink[dotted] = min(lowlink[dotted], index[successor])
+            else:
+                if pending:
+                    parent = pending[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[dotted])
+                if lowlink[dotted] == index[dotted]:
+                    component = []
+                    while not component or component[-1] != dotted:
+                        component.append(stack.pop())
+                        on_stack.discard(component[-1])
+                    cyclic = len(component) > 1 or dotted in self._successors(dotted)
+                    for member in component:
+                        self._cyclic[member] = cyclic
+
+    def _resolve(self, dotted: str) -> Dict:
+        if dotted not in self._resolved:
+            self._resolved[dotted] = self._flatten(self.get(dotted))
+        return self._resolved[dotted]
+
+    def _flatten(self, tree: any) -> any:
+        if tree is None:
+            return {}
+        if "$ref" in tree:
+            dotted = self.dotted(tree["$ref"])
+            # A definition that refers back to itself (e.g:
+            # vapi.std.localization_param and
+            # vapi.std.nested_localizable_message) would lead to an endless
+            # loop. Its references are replaced by a {"go_to": name}
+            # placeholder.
+            if self.is_cyclic(dotted):
+                return {"go_to": dotted}
+            resolved = self._resolve(dotted)
+            if "description" not in resolved and "description" in tree:
+                # Never modify the cached definition, it's shared
+                resolved = dict(resolved, description=tree["description"])
+            return resolved
+        return {
+            k: self._flatten(v) if isinstance(v, dict) else v
+            for k, v in tree.items()
+        }
+
+
+def _copy_tree(tree: any) -> any:
+    """Return a copy of tree that shares none of its dicts and lists."""
+    if isinstance(tree, dict):
+        return {k: _copy_tree(v) for k, v in tree.items()}
+    if isinstance(tree, list):
+        return [_copy_tree(i) for i in tree]
+    return tree
+
 
 class Path:
     def __init__(self, path: str, value: any):
@@ -1473,118 +1716,306 @@ class Path:
     def summary(self, verb: str) -> str:
         return self.value[verb]["summary"]
 
-    def is_tech_preview(self) -> bool:
-        for verb in self.value.keys():
-            if "Technology Preview" in self.summary(verb):
-                return True
-        return False
-
 
 class SwaggerFile:
-    def __init__(self, raw_content: any, definitions="definitions"):
+    def __init__(self, raw_content: any, definitions="definitions", index: Optional[Dict] = None):
         super().__init__()
-        self.resources = {}
-        json_content = json.loads(raw_content)
-        self.definitions = Definitions(json_content[definitions])
-        self.paths = self.load_paths(json_content["paths"])
+        if isinstance(raw_content, (str, bytes)):
+            json_content = json.loads(raw_content)
+        else:
+            json_content = raw_content
+        if index is None:
+            index = self.build_index(json_content["paths"])
+        self.definitions = Definitions(json_content[definitions], cyclic=index.get("cyclic"))
+        for message in index["messages"]:
+            print(message)
+        with profiler.stage("resource grouping"):
+            self.paths = self.load_paths(json_content["paths"], index)
+            self.resources = self.load_resources(self.paths, index)
+
+    @classmethod
+    def load(
+        cls, spec_file: str, definitions="definitions", cache_dir: Optional[str] = None
+    ) -> "SwaggerFile":
+        """Read a spec file, a definition is only decoded when a module refers to it.
+
+        With cache_dir, the index of the paths and the cyclic definitions are
+        stored in the snapshot of the file, see load_schema(). The schemas of
+        an OpenAPI v3 spec are one level deeper, in components.schemas.
+        """
+
+        def indexer(content: Dict) -> Dict:
+            index = cls.build_index(content["paths"])
+            index["cyclic"] = Definitions(content[definitions]).find_cycles(content["paths"])
+            return index
+
+        with profiler.stage("spec load"):
+            json_content, index = load_schema(
+                spec_file,
+                depth=3 if definitions == "components" else 2,
+                indexer=indexer,
+                index_key=cls.index_key(),
+                cache_dir=cache_dir,
+            )
+        return cls(json_content, definitions=definitions, index=index)
 
     @staticmethod
-    def load_paths(paths: str) -> Dict:
-        result = {}
+    def index_key() -> str:
+        """Hash of the code that builds the index, a snapshot built by another version is ignored."""
+        sources = [
+            pathlib.Path(__file__),
+            pathlib.Path(__file__).parents[1] / "plugin_utils" / "cloud_utils" / "utils.py",
+        ]
+        return fingerprint(hash_files(sources))
+
+    @staticmethod
+    def build_index(paths: Dict) -> Dict:
+        """Classify the paths of the spec in a single pass.
 
-        for path in [Path(p, v) for p, v in paths.items()]:
-            if path.is_tech_preview():
+        The result only holds names, the paths to keep with their operations
+        and how the operations are grouped by resource, so it can be
+        serialized.
+        """
+        index = {"paths": [], "resources": {}, "messages": []}
+        parameters_from = None
+        for path, value in paths.items():
+            if any("Technology Preview" in desc["summary"] for desc in value.values()):
                 continue
-            result[path.path] = path
-            for verb, desc in path.value.items():
+            operations = {}
+            for verb, desc in value.items():
                 operationId = desc["operationId"]
                 if desc.get("deprecated"):
                     continue
-                try:
-                    parameters = desc["parameters"]
-                except KeyError:
-                    print(f"No parameters for {operationId} {path.path}")
-                if path.path.startswith("/rest/vcenter/vm/{vm}/tools"):
+                # NOTE: an operation without parameters reuses the ones of
+                # the previous operation
+                if "parameters" in desc:
+                    parameters_from = [path, verb]
+                else:
+                    index["messages"].append(f"No parameters for {operationId} {path}")
+                if path.startswith("/rest/vcenter/vm/{vm}/tools"):
                     if operationId == "upgrade":
-                        print(f"Skipping {path.path} upgrade (broken)")
+                        index["messages"].append(f"Skipping {path} upgrade (broken)")
                         continue
-                if path.path == "/api/appliance/infraprofile/configs":
+                if path == "/api/appliance/infraprofile/configs":
                     if operationId == "validate$task":
-                        print(f"Skipping {path.path} upgrade (broken)")
+                        index["messages"].append(f"Skipping {path} upgrade (broken)")
                         continue
+                operations[operationId] = [verb, parameters_from]
+            index["paths"].append([path, operations])
+
+            if "vmw-task=true" in path:
+                continue
+            name = path_to_name(path)
+            if name == "esx_settings_clusters_software_drafts":
+                continue
+            resource = index["resources"].setdefault(name, {"summary": {}, "operations": {}})
+            for operationId, (verb, _) in operations.items():
+                resource["summary"][operationId] = [path, verb]
+                if operationId in resource["operations"]:
+                    defined_path, defined_operationId = resource["operations"][operationId]
+                    index["messages"].append(
+                        f"Cannot create operationId ({operationId}) with path "
+                        f"({verb}) {path}. already defined: "
+                        f"{defined_operationId} {defined_path}"
+                    )
+                    continue
+                # NOTE: Not sure if this is the right thing to do
+                resource["operations"][operationId.replace("$task", "")] = [path, operationId]
+        return index
+
+    @staticmethod
+    def load_paths(paths: Dict, index: Dict) -> Dict:
+        result = {}
+        for path_name, operations in index["paths"]:
+            path = Path(path_name, paths[path_name])
+            for operationId, (verb, parameters_from) in operations.items():
+                parameters = None
+                if parameters_from:
+                    parameters = paths[parameters_from[0]][parameters_from[1]]["parameters"]
                 path.operations[operationId] = (
                     verb,
                     path.path,
                     parameters,
-                    desc["responses"],
+                    path.value[verb]["responses"],
                 )
+            result[path.path] = path
         return result
 
     @staticmethod
-    def init_resources(paths: str) -> Dict:
+    def load_resources(paths: Dict, index: Dict) -> Dict:
         resources = {}
-        for path in paths:
-            if "vmw-task=true" in path.path:
-                continue
-
-            name = path_to_name(path.path)
-            if name == "esx_settings_clusters_software_drafts":
-                continue
-            if name not in resources:
-                resources[name] = Resource(name)
-
-            for operationId, v in path.operations.items():
-                verb = v[0]
-                resources[name].summary[operationId] = path.summary(verb)
-                if operationId in resources[name].operations:
-                    print(
-                        f"Cannot create operationId ({operationId}) with path "
-                        f"({verb}) {path.path}. already defined: "
-                        f"{resources[name].operations[operationId]}"
-                    )
-                    continue
-                operationId = operationId.replace(
-                    "$task", ""
-                )  # NOTE: Not sure if this is the right thing to do
-                resources[name].operations[operationId] = v
+        for name, data in index["resources"].items():
+            resource = Resource(name)
+            for operationId, (path, verb) in data["summary"].items():
+                resource.summary[operationId] = paths[path].summary(verb)
+            for operationId, (path, path_operationId) in data["operations"].items():
+                resource.operations[operationId] = paths[path].operations[path_operationId]
+            resources[name] = resource
         return resources
 
 
 # module_generation procs
 
 
-def generate_amazon_cloud(args: Iterable, role_path: str):
-    module_list = []
-    resource_file = pathlib.Path(args.get("modules") + "/modules.yaml")
+# Modules waiting to be rendered by the process pool. The workers are forked
+# after this list is populated, so they inherit it and only need the index
+# of the module to render instead of a pickled copy of the whole spec.
+_RENDER_QUEUE: List = []
 
-    RESOURCES = yaml.load(
-        pathlib.Path(resource_file).read_text(), Loader=yaml.FullLoader
-    )
 
-    for module in RESOURCES:
+def _render_module(module: any, render_args: Dict) -> Tuple[bool, Optional[str], Dict[str, float]]:
+    """Return if the module file changed, the traceback of the failure, if any,
+    and the time spent in each stage, when profiling.
+    """
+    with profiler.resource(module.name) as timings:
+        try:
+            changed = module.renderer(**render_args)
+        except Exception:
+            return False, traceback.format_exc(), timings
+    return bool(changed), None, timings
+
+
+def _render_queued_module(index: int, render_args: Dict) -> Tuple[bool, Optional[str], Dict[str, float]]:
+    return _render_module(_RENDER_QUEUE[index], render_args)
+
+
+def generator_fingerprint(role_path: str) -> str:
+    """Hash of the code and the templates used to render the modules."""
+    sources = [
+        pathlib.Path(__file__),
+        *sorted(pathlib.Path(__file__).parents[1].glob("plugin_utils/cloud_utils/*.py")),
+        *sorted(pathlib.Path(role_path, "templates", "module_directory").glob("**/*.j2")),
+    ]
+    return fingerprint(hash_files(sources))
+
+
+def render_modules(modules: List, workers: int = 1, force: bool = False, **render_args: any) -> Dict:
+    """Call the renderer of each module, in a process pool if workers > 1.
+
+    A module that fails to render does not abort the run, its traceback
+    is reported in failed_modules instead. The names of the rendered modules
+    are always returned in the order of the input list. The module files
+    whose content changed are listed in changed_files.
+
+    The fingerprint of the inputs of each module is kept in the build manifest
+    of the target collection. Unless force is set, the modules whose inputs,
+    templates and generator code have not changed since the last build are
+    not rendered again, they are listed in skipped_modules.
+    """
+    target_dir = render_args.get("target_dir")
+    manifest = BuildManifest.load(target_dir) if target_dir else None
+    common = None
+    fingerprints = [None] * len(modules)
+    for index, module in enumerate(modules):
+        if manifest is None or not hasattr(module, "build_inputs"):
+            continue
+        with profiler.stage("fingerprint"):
+            inputs = module.build_inputs(target_dir, render_args["module_dir"])
+        if inputs is None:
+            continue
+        if common is None:
+            common = [
+                generator_fingerprint(render_args["role_path"]),
+                render_args.get("next_version"),
+            ]
+        with profiler.stage("fingerprint"):
+            fingerprints[index] = fingerprint(
+                common, type(module).__name__, module.template_file, inputs
+            )
+
+    to_render = [
+        index
+        for index, module in enumerate(modules)
+        if force
+        or not manifest.is_up_to_date(module.name, fingerprints[index])
+        or not module.module_path(target_dir).exists()
+    ] if common else list(range(len(modules)))
+
+    if workers > 1 and len(to_render) > 1:
+        _RENDER_QUEUE[:] = modules
+        try:
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("fork")
+            ) as executor:
+                futures = [
+                    executor.submit(_render_queued_module, index, render_args)
+                    for index in to_render
+                ]
+                outcomes = []
+                for future in futures:
+                    try:
+                        outcomes.append(future.result())
+                    except Exception:
+                        # the worker itself died (e.g: BrokenProcessPool)
+                        outcomes.append((False, traceback.format_exc(), {}))
+        finally:
+            _RENDER_QUEUE.clear()
+        for index, (_changed, _error, timings) in zip(to_render, outcomes):
+            if timings:
+                profiler.merge(modules[index].name, timings)
+    else:
+        outcomes = [_render_module(modules[index], render_args) for index in to_render]
+    outcomes_by_index = dict(zip(to_render, outcomes))
+
+    result = {"modules": [], "failed_modules": {}, "skipped_modules": [], "changed_files": []}
+    for index, module in enumerate(modules):
+        if index not in outcomes_by_index:
+            result["skipped_modules"].append(module.name)
+            result["modules"].append(module.name)
+            continue
+        changed, error, _timings = outcomes_by_index[index]
+        if error:
+            print(f"Failed to render {module.name}:\n{error}")
+            result["failed_modules"][module.name] = error
+        else:
+            result["modules"].append(module.name)
+        if changed:
+            result["changed_files"].append(f"plugins/modules/{module.name}.py")
+        if common:
+            manifest.update(module.name, None if error else fingerprints[index])
+
+    if common:
+        manifest.save()
+    return result
+
+
+def generate_amazon_cloud(args: Iterable, role_path: str):
+    modules_to_render = []
+
+    for module in ModuleConfig.load(args.get("modules")).entries:
         for k, v in module.items():
             type_name = v["resource"]
         file_name = re.sub("::", "_", type_name)
         print(f"Generating modules {file_name}")
         schema_file = pathlib.Path(args.get("schema_dir") + "/" + file_name + ".json")
-        schema = json.loads(schema_file.read_text())
-
-        module = AnsibleModuleBaseAmazon(schema=schema)
-
-        if module.is_trusted(args.get("modules")):
-            module.renderer(
-                target_dir=args.get("target_dir"),
-                module_dir=args.get("modules"),
-                next_version=args.get("next_version"),
-                role_path=role_path,
-            )
-            module_list.append(module.name)
+        with profiler.stage("spec load"):
+            schema = json.loads(schema_file.read_text())
+
+        with profiler.stage("resource grouping"):
+            module = AnsibleModuleBaseAmazon(schema=schema)
+            if module.is_trusted(args.get("modules")):
+                modules_to_render.append(module)
+
+    # Read the git history before forking the workers, so they all reuse it
+    with profiler.stage("git history"):
+        get_modules_history(*git_history_location(args.get("target_dir")))
+
+    result = render_modules(
+        modules_to_render,
+        workers=int(args.get("workers") or 1),
+        force=boolean(args.get("force", False)),
+        target_dir=args.get("target_dir"),
+        module_dir=args.get("modules"),
+        next_version=args.get("next_version"),
+        role_path=role_path,
+    )
+    module_list = result["modules"]
 
     modules = [f"plugins/modules/{module}.py" for module in module_list]
     module_utils = ["plugins/module_utils/core.py", "plugins/module_utils/utils.py"]
 
+    output = OutputFiles(args.get("target_dir"))
     ignore_dir = pathlib.Path(args.get("target_dir") + "/tests/sanity")
-    ignore_dir.mkdir(parents=True, exist_ok=True)
 
     for version in ["2.9", "2.10", "2.11", "2.12", "2.13", "2.14", "2.15"]:
         per_version_ignore_content = ""
@@ -1674,14 +2105,14 @@ def generate_amazon_cloud(args: Iterable, role_path: str):
 
         # keep all non-plugins entries from ignore file
         if ignore_file.exists():
-            for line in ignore_file.read_text().split("\n"):
-                if not line.startswith("plugins/"):
+            for line in ignore_file.read_text().splitlines():
+                if line and not line.startswith("plugins/"):
                     per_version_ignore_content += line + "\n"
 
-        ignore_file.write_text(per_version_ignore_content)
+        with profiler.stage("write"):
+            output.write(ignore_file, per_version_ignore_content)
 
     meta_dir = pathlib.Path(args.get("target_dir") + "/meta")
-    meta_dir.mkdir(parents=True, exist_ok=True)
     yaml_dict = {
         "requires_ansible": """>=2.11.0""",
         "action_groups": {"aws": []},
@@ -1710,21 +2141,23 @@ def generate_amazon_cloud(args: Iterable, role_path: str):
     )
 
     runtime_file = meta_dir / "runtime.yml"
-    with open(runtime_file, "w") as file:
-        yaml.safe_dump(yaml_dict, file, sort_keys=False)
+    with profiler.stage("write"):
+        output.write(runtime_file, yaml.safe_dump(yaml_dict, sort_keys=False))
 
-    return
+    result["changed_files"] += output.changed
+    return result
 
 
 def generate_vmware_rest(args: Iterable, role_path: str):
-    module_list = []
+    modules_to_render = []
 
     for json_file in ["vcenter.json", "content.json", "appliance.json"]:
         print("Generating modules from {}".format(json_file))
         api_spec_file = pathlib.Path(args.get("schema_dir") + "/" + json_file)
-        raw_content = api_spec_file.read_text()
-        swagger_file = SwaggerFile(raw_content)
-        resources = swagger_file.init_resources(swagger_file.paths.values())
+        swagger_file = SwaggerFile.load(
+            api_spec_file, cache_dir=get_cache_dir(args.get("target_dir"))
+        )
+        resources = swagger_file.resources
 
         for resource in resources.values():
             if resource.name == "appliance_logging_forwarding":
@@ -1739,13 +2172,7 @@ def generate_vmware_rest(args: Iterable, role_path: str):
                     module.is_trusted(args.get("modules"))
                     and len(module.default_operationIds) > 0
                 ):
-                    module.renderer(
-                        target_dir=args.get("target_dir"),
-                        module_dir=args.get("modules"),
-                        next_version=args.get("next_version"),
-                        role_path=role_path
-                    )
-                    module_list.append(module.name)
+                    modules_to_render.append(module)
             elif "get" in resource.operations:
                 module = AnsibleInfoNoListModule(
                     resource, definitions=swagger_file.definitions
@@ -1754,47 +2181,48 @@ def generate_vmware_rest(args: Iterable, role_path: str):
                     module.is_trusted(args.get("modules"))
                     and len(module.default_operationIds) > 0
                 ):
-                    module.renderer(
-                        target_dir=args.get("target_dir"),
-                        module_dir=args.get("modules"),
-                        next_version=args.get("next_version"),
-                        role_path=role_path,
-                    )
-                    module_list.append(module.name)
+                    modules_to_render.append(module)
 
             module = AnsibleModuleBaseVmware(
                 resource, definitions=swagger_file.definitions
             )
 
             if module.is_trusted(args.get("modules")) and len(module.default_operationIds) > 0:
-                module.renderer(
-                    target_dir=args.get("target_dir"),
-                    module_dir=args.get("modules"),
-                    next_version=args.get("next_version"),
-                    role_path=role_path
-                )
-                module_list.append(module.name)
+                modules_to_render.append(module)
+
+    result = render_modules(
+        modules_to_render,
+        workers=int(args.get("workers") or 1),
+        force=boolean(args.get("force", False)),
+        target_dir=args.get("target_dir"),
+        module_dir=args.get("modules"),
+        next_version=args.get("next_version"),
+        role_path=role_path,
+    )
 
     print("Generating meta/runtime.yml")
-    runtime_yml = generate_runtime_yml(args.get("requires_ansible"), "vmware_rest", module_list)
-    meta_dir = pathlib.Path(args.get("target_dir") + "/meta")
-    meta_dir.mkdir(parents=True, exist_ok=True)
-    runtime_file = meta_dir / "runtime.yml"
-    with open(runtime_file, "w") as file:
-        yaml.safe_dump(runtime_yml, file, sort_keys=False)
+    runtime_yml = generate_runtime_yml(args.get("requires_ansible"), "vmware_rest", result["modules"])
+    output = OutputFiles(args.get("target_dir"))
+    runtime_file = pathlib.Path(args.get("target_dir") + "/meta/runtime.yml")
+    with profiler.stage("write"):
+        output.write(runtime_file, yaml.safe_dump(runtime_yml, sort_keys=False))
 
-    return
+    result["changed_files"] += output.changed
+    return result
 
 
 def generate_cisco_intersight(args: Iterable, role_path: str):
-    module_list = []
+    modules_to_render = []
 
     for json_file in ["intersight_server.json"]:
         print("Generating modules from {}".format(json_file))
         api_spec_file = pathlib.Path(args.get("schema_dir") + "/" + json_file)
-        raw_content = api_spec_file.read_text()
-        swagger_file = SwaggerFile(raw_content, definitions="components")
-        resources = swagger_file.init_resources(swagger_file.paths.values())
+        swagger_file = SwaggerFile.load(
+            api_spec_file,
+            definitions="components",
+            cache_dir=get_cache_dir(args.get("target_dir")),
+        )
+        resources = swagger_file.resources
 
         for resource in resources.values():
             if "list" in resource.operations:
@@ -1804,13 +2232,7 @@ def generate_cisco_intersight(args: Iterable, role_path: str):
                 if (
                     len(module.default_operationIds) > 0
                 ):
-                    module.renderer(
-                        target_dir=args.get("target_dir"),
-                        module_dir=args.get("modules"),
-                        next_version=args.get("next_version"),
-                        role_path=role_path
-                    )
-                    module_list.append(module.name)
+                    modules_to_render.append(module)
             elif "get" in resource.operations:
                 module = AnsibleInfoNoListModule(
                     resource, definitions=swagger_file.definitions
@@ -1818,36 +2240,34 @@ def generate_cisco_intersight(args: Iterable, role_path: str):
                 if (
                     len(module.default_operationIds) > 0
                 ):
-                    module.renderer(
-                        target_dir=args.get("target_dir"),
-                        module_dir=args.get("modules"),
-                        next_version=args.get("next_version"),
-                        role_path=role_path,
-                    )
-                    module_list.append(module.name)
+                    modules_to_render.append(module)
 
             module = AnsibleModuleBaseCiscoIntersight(
                 resource, definitions=swagger_file.definitions
             )
 
             if len(module.default_operationIds) > 0:
-                module.renderer(
-                    target_dir=args.get("target_dir"),
-                    module_dir=args.get("modules"),
-                    next_version=args.get("next_version"),
-                    role_path=role_path
-                )
-                module_list.append(module.name)
+                modules_to_render.append(module)
+
+    result = render_modules(
+        modules_to_render,
+        workers=int(args.get("workers") or 1),
+        force=boolean(args.get("force", False)),
+        target_dir=args.get("target_dir"),
+        module_dir=args.get("modules"),
+        next_version=args.get("next_version"),
+        role_path=role_path,
+    )
 
     print("Generating meta/runtime.yml")
-    runtime_yml = generate_runtime_yml(args.get("requires_ansible"), "cisco_intersight", module_list)
-    meta_dir = pathlib.Path(args.get("target_dir") + "/meta")
-    meta_dir.mkdir(parents=True, exist_ok=True)
-    runtime_file = meta_dir / "runtime.yml"
-    with open(runtime_file, "w") as file:
-        yaml.safe_dump(runtime_yml, file, sort_keys=False)
+    runtime_yml = generate_runtime_yml(args.get("requires_ansible"), "cisco_intersight", result["modules"])
+    output = OutputFiles(args.get("target_dir"))
+    runtime_file = pathlib.Path(args.get("target_dir") + "/meta/runtime.yml")
+    with profiler.stage("write"):
+        output.write(runtime_file, yaml.safe_dump(runtime_yml, sort_keys=False))
 
-    return
+    result["changed_files"] += output.changed
+    return result
 
 
 class ActionModule(ActionBase):
@@ -1880,11 +2300,24 @@ class ActionModule(ActionBase):
         
         args = self._task.args
         func = "generate_" + args['collection'] + "(args, task_vars['vars']['role_path'])"
-        eval(func)
+        with warnings.catch_warnings(record=True) as caught, profiling(args, self._result):
+            result = eval(func)
+        for warning in caught:
+            self._result.setdefault("warnings", []).append(str(warning.message))
+
+        self._result["modules"] = result["modules"]
+        self._result["skipped_modules"] = result["skipped_modules"]
+        if result["failed_modules"]:
+            self._result["failed"] = True
+            self._result["failed_modules"] = result["failed_modules"]
+            self._result["msg"] = "Failed to render: {}".format(
+                ", ".join(result["failed_modules"])
+            )
 
         # info = VersionInfo("content_builder")
-        dev_md = pathlib.Path(args.get("target_dir") + "/dev.md")
-        dev_md.write_text(
+        output = OutputFiles(args.get("target_dir"))
+        output.write(
+            args.get("target_dir") + "/dev.md",
             (
                 "The modules are autogenerated by:\n"
                 "https://github.com/ansible-community/ansible.content_builder\n"
@@ -1892,8 +2325,8 @@ class ActionModule(ActionBase):
                 
             )
         )
-        dev_md = pathlib.Path(args.get("target_dir") + "/commit_message")
-        dev_md.write_text(
+        output.write(
+            args.get("target_dir") + "/commit_message",
             (
                 "bump auto-generated modules\n"
                 "\n"
@@ -1901,4 +2334,6 @@ class ActionModule(ActionBase):
                 ""
             )
         )
+        self._result["changed_files"] = result["changed_files"] + output.changed
+        self._result["changed"] = bool(self._result["changed_files"])
         return self._result
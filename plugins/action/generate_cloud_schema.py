@@ -6,12 +6,13 @@ import pathlib
 import re
 from typing import Dict, List, Optional, TypedDict
 import boto3
+import botocore.config
 import json
-import yaml
 from ansible_collections.ansible.content_builder.plugins.plugin_utils.cloud_utils import (
     generator,
     utils
 )
+from ansible.module_utils.parsing.convert_bool import boolean
 from ansible.plugins.action import ActionBase
 
 
@@ -52,6 +53,86 @@ def generate_schema(raw_content) -> Dict:
     return schema
 
 
+def cloudformation_client(endpoint_url: Optional[str] = None, workers: int = 8):
+    """Return a CloudFormation client that can be shared by `workers` threads."""
+    config = botocore.config.Config(
+        retries={"mode": "adaptive", "max_attempts": 10},
+        max_pool_connections=max(workers, 10),
+    )
+    return boto3.client("cloudformation", endpoint_url=endpoint_url, config=config)
+
+
+def schema_source(location: Optional[str] = None, workers: int = 8) -> generator.SchemaSource:
+    """Return the source of the schemas.
+
+    By default, the schemas are downloaded from AWS. The location can also be
+    the URL of a CloudFormation endpoint, or a directory of schema files.
+    """
+    if location and not re.match(r"https?://", location):
+        return generator.DirectorySchemaSource(location)
+    return generator.CloudFormationWrapper(cloudformation_client(location, workers))
+
+
+def collect_schemas(
+    cloudformation: generator.SchemaSource,
+    type_names: List[str],
+    api_object_path: str,
+    workers: int = 8,
+    force: bool = False,
+) -> Dict:
+    """Download the schemas of the types whose version changed since the last run.
+
+    The versions returned by list-types are kept in schema_versions.json.
+    A type that is not listed (e.g: a third party type) is always downloaded.
+    """
+    schema_dir = pathlib.Path(api_object_path)
+    versions_file = schema_dir / "schema_versions.json"
+    known_versions = {}
+    if versions_file.exists() and not force:
+        try:
+            known_versions = json.loads(versions_file.read_text())
+        except ValueError:
+            print(f"Ignoring the invalid file {versions_file}")
+
+    try:
+        versions = cloudformation.list_type_versions()
+    except Exception as e:
+        print(f"Cannot list the CloudFormation types, all the schemas will be collected: {e}")
+        versions = {}
+
+    def schema_file(type_name: str) -> pathlib.Path:
+        return schema_dir / (re.sub("::", "_", type_name) + ".json")
+
+    to_fetch = [
+        type_name
+        for type_name in type_names
+        if type_name not in versions
+        or known_versions.get(type_name) != versions[type_name]
+        or not schema_file(type_name).exists()
+    ]
+    print(f"Collecting {len(to_fetch)} schemas, {len(type_names) - len(to_fetch)} are up to date")
+    schemas, errors = cloudformation.fetch_schemas(to_fetch, workers=workers)
+
+    result = {"changed": False, "collected": [], "failed_resources": errors}
+    for type_name, raw_content in schemas.items():
+        print(type_name)
+        schema = generate_schema(raw_content)
+        if utils.write_if_changed(schema_file(type_name), json.dumps(schema, indent=2)):
+            result["changed"] = True
+        result["collected"].append(type_name)
+        if type_name in versions:
+            known_versions[type_name] = versions[type_name]
+        else:
+            known_versions.pop(type_name, None)
+
+    for type_name, error in errors.items():
+        print(f"Failed to collect {type_name}:\n{error}")
+        known_versions.pop(type_name, None)
+
+    utils.write_if_changed(versions_file, json.dumps(known_versions, indent=2, sort_keys=True))
+    return result
+
+
 class ActionModule(ActionBase):
 
     def __init__(self, *args, **kwargs):
@@ -81,23 +162,27 @@ class ActionModule(ActionBase):
         self._task_vars = task_vars
 
         args = self._task.args
-        resource_file = pathlib.Path(args.get("resource") + "/modules.yaml")
 
-        RESOURCES = yaml.load(
-            pathlib.Path(resource_file).read_text(), Loader=yaml.FullLoader
-        )
-
-        for module in RESOURCES:
+        type_names = []
+        for module in utils.ModuleConfig.load(args.get("resource")).entries:
             for k, v in module.items():
                 type_name = v["resource"]
-            print("Collecting Schema")
-            print(type_name)
-            cloudformation = generator.CloudFormationWrapper(boto3.client("cloudformation"))
-            raw_content = cloudformation.generate_docs(type_name)
-            schema = generate_schema(raw_content)
-            file_name = re.sub("::", "_", type_name)
-            if not pathlib.Path(args.get("api_object_path")).exists():
-                pathlib.Path(args.get("api_object_path")).mkdir(parents=True, exist_ok=True)
-            schema_file = pathlib.Path(args.get("api_object_path") + "/" + file_name + ".json")
-            schema_file.write_text(json.dumps(schema, indent=2))
+            type_names.append(type_name)
+
+        workers = int(args.get("workers") or 8)
+        cloudformation = schema_source(args.get("schema_source"), workers)
+        self._result.update(
+            collect_schemas(
+                cloudformation,
+                type_names,
+                args.get("api_object_path"),
+                workers=workers,
+                force=boolean(args.get("force", False)),
+            )
+        )
+        if self._result["failed_resources"]:
+            self._result["failed"] = True
+            self._result["msg"] = "Failed to collect: {}".format(
+                ", ".join(self._result["failed_resources"])
+            )
         return self._result
@@ -2,14 +2,15 @@
 # GNU General Public License v3.0+
 # (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
 
-import ast
+from ansible_collections.ansible.content_builder.plugins.plugin_utils.cloud_utils.module_blocks import (
+    get_module_block,
+)
 
 
 def get_example(module):
-    for node in ast.walk(ast.parse(module)):
-        if isinstance(node, ast.Assign):
-            if node.targets[0].id == "EXAMPLES":
-                return node.value.s.strip()
+    block = get_module_block(module, "EXAMPLES")
+    if block is not None:
+        return block.strip()
 
 
 class FilterModule(object):
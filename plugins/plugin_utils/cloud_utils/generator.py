@@ -4,23 +4,45 @@
 # GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
 
 
+import abc
 import copy
+import pathlib
 import re
-from typing import Iterable, List, Dict
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Dict, Optional, Set, Tuple
 from ansible_collections.ansible.content_builder.plugins.plugin_utils.cloud_utils.utils import (
     python_type,
-    get_module_from_config,
-    scrub_keys,
+    ModuleConfig,
     camel_to_snake,
-    ensure_description,
+    file_sha256,
+    MISSING_DESCRIPTION,
 )
 
 
+_SENTENCE_END = re.compile(r"(?<=[^A-Z].[.?]) +(?=[A-Z])")
+_CAMEL_CASE_WORD = re.compile(r"([A-Z]+[A-Za-z]+)+([A-Z][a-z]+)+")
+_UPPER_CASE_WORD = re.compile(r"[A-Z_]+[0-9A-Z]+")
+_CAPITALIZED_WORD = re.compile(r"(?<!^)(?<!\. )[A-Z][a-z]+")
+_NUMBER = re.compile(r"\d+")
+_LINK = re.compile(r"(https?://[^\s]+)")
+_SQUARE_BRACKETS = re.compile(r"[\[].*?[\]]")
+_SURROUNDING_SPACES = re.compile(r"^\s+|\s+$")
+_QUOTES = re.compile("[\"'\\`]")
+
+
 class Description:
+    ignored_values = frozenset(["PUT", "S3", "EC2"])
+
     @classmethod
-    def normalize(cls, string: str, definitions: Iterable = {}) -> List[str]:
+    def normalize(
+        cls,
+        string: str,
+        definitions: Iterable = {},
+        vocabulary: Optional[Tuple[Set[str], Set[str]]] = None,
+    ) -> List[str]:
         with_no_line_break: List[str] = []
-        sentences = re.split(r"(?<=[^A-Z].[.?]) +(?=[A-Z])", string)
+        sentences = _SENTENCE_END.split(string)
         sentences[:] = [x for x in sentences if x]
 
         for line in sentences:
@@ -31,40 +53,49 @@ class Description:
             else:
                 with_no_line_break.append(line)
 
-        with_no_line_break = [cls.clean_up(definitions, i) for i in with_no_line_break]
+        if vocabulary is None:
+            vocabulary = cls.vocabulary(definitions)
+        with_no_line_break = [
+            cls.clean_up(definitions, i, vocabulary) for i in with_no_line_break
+        ]
 
         return with_no_line_break
 
-    @classmethod
-    def clean_up(cls, definitions: Iterable, my_string: str) -> str:
-        values = set()
-        keys = set()
-
-        ignored_values = set(["PUT", "S3", "EC2"])
+    @staticmethod
+    def vocabulary(definitions: Iterable) -> Tuple[Set[str], Set[str]]:
+        """Return the keys and the choices found at any level of the definitions."""
+        keys: Set[str] = set()
+        values: Set[str] = set()
 
         def get_keys(a_dict):
-            keys = []
             if isinstance(a_dict, list):
                 for item in a_dict:
-                    keys.extend(get_keys(item))
+                    get_keys(item)
             elif isinstance(a_dict, dict):
-                for key in a_dict:
-                    keys.append(key)
-                    keys.extend(get_keys(a_dict[key]))
-            return keys
+                keys.update(a_dict)
+                for value in a_dict.values():
+                    get_keys(value)
 
         def get_values(a_dict):
             for key, value in a_dict.items():
                 if isinstance(value, dict):
-                    yield from get_values(value)
-                else:
-                    if key in ("choices", "enum"):
-                        yield value
+                    get_values(value)
+                elif key in ("choices", "enum"):
+                    values.update(value)
 
-        for value in get_values(definitions):
-            values |= set(value)
+        get_values(definitions)
+        get_keys(definitions)
+        return keys, values
 
-        keys = set(get_keys(definitions))
+    @classmethod
+    def clean_up(
+        cls,
+        definitions: Iterable,
+        my_string: str,
+        vocabulary: Optional[Tuple[Set[str], Set[str]]] = None,
+    ) -> str:
+        keys, values = vocabulary or cls.vocabulary(definitions)
+        ignored_values = cls.ignored_values
 
         def rewrite_name(matchobj):
             """Rewrite option name to I(camel_to_snake(option))"""
@@ -96,10 +127,9 @@ class Description:
 
         def find_match(pattern, my_string):
             """Find matching string using a pattern and rewrite it as needed."""
-            matches = re.findall(pattern, my_string)
-            if matches:
-                output = re.sub(r"\d+", rewrite_value, my_string)
-                output = re.sub(r"(?<!^)(?<!\. )[A-Z][a-z]+", rewrite_name, output)
+            if pattern in my_string:
+                output = _NUMBER.sub(rewrite_value, my_string)
+                output = _CAPITALIZED_WORD.sub(rewrite_name, output)
                 return output
             return my_string
 
@@ -108,27 +138,27 @@ class Description:
             Find CamelCase words (likely to be parameter names, some rewite I(to_snake).
             Find uppercase words (likely to be values like EXAMPLE or EXAMPLE_EXAMPLE and rewrite with C(EXAMPLE)).
             """
-            lword = re.sub(r"([A-Z]+[A-Za-z]+)+([A-Z][a-z]+)+", rewrite_name, line)
-            lword = re.sub(r"[A-Z_]+[0-9A-Z]+", rewrite_value, lword)
+            lword = _CAMEL_CASE_WORD.sub(rewrite_name, line)
+            lword = _UPPER_CASE_WORD.sub(rewrite_value, lword)
             return lword
 
         my_string = format_string(my_string)
 
         # Find link and replace it with U(link)
-        my_string = re.sub(r"(https?://[^\s]+)", rewrite_link, my_string)
+        my_string = _LINK.sub(rewrite_link, my_string)
 
         # Cleanup phrase removing square brackets contained words
-        my_string = re.sub(r"[\[].*?[\]]", "", my_string)
+        my_string = _SQUARE_BRACKETS.sub("", my_string)
 
         my_string = find_match("values are:", my_string)
         my_string = find_match("following properties:", my_string)
 
         # Substitute one or more white space at beginning and end of the string with an empty string
-        my_string = re.sub(r"^\s+|\s+$", "", my_string)
-        my_string = re.sub(r"TRUE", "C(True)", my_string)
+        my_string = _SURROUNDING_SPACES.sub("", my_string)
+        my_string = my_string.replace("TRUE", "C(True)")
 
         # Cleanup some quotes
-        my_string = re.sub("[\"'\\`]", "", my_string)
+        my_string = _QUOTES.sub("", my_string)
 
         if not my_string.endswith("."):
             my_string = my_string + "."
@@ -137,10 +167,39 @@ class Description:
 
 
 class Documentation:
-    def replace_keys(self, options: Iterable, definitions: Iterable):
-        """Sanitize module's options and replace $ref with the correspoding parameters"""
-        dict_copy = copy.copy(options)
-        for key in dict_copy.keys():
+    # Schema keywords that are not relevant for the module documentation
+    scrubbed_keys = frozenset(
+        [
+            "additionalProperties",
+            "insertionOrder",
+            "uniqueItems",
+            "pattern",
+            "examples",
+            "maxLength",
+            "minLength",
+            "format",
+            "minimum",
+            "maximum",
+            "patternProperties",
+            "maxItems",
+            "minItems",
+        ]
+    )
+    _vocabulary: Optional[Tuple[Set[str], Set[str]]] = None
+
+    def vocabulary(self) -> Tuple[Set[str], Set[str]]:
+        """Return the vocabulary of the definitions, see Description.vocabulary()."""
+        if self._vocabulary is None:
+            self._vocabulary = Description.vocabulary(self.definitions)
+        return self._vocabulary
+
+    def replace_keys(self, options: Dict, definitions: Dict):
+        """Sanitize module's options and replace $ref with the correspoding parameters
+
+        Each option referring to a definition gets its own copy of it, the
+        definitions are left untouched.
+        """
+        for key in list(options):
             if (
                 camel_to_snake(key) in self.read_only_properties
                 and camel_to_snake(key) not in self.primary_identifier
@@ -175,23 +234,20 @@ class Documentation:
                 if "$ref" in item:
                     lookup_param = item["$ref"].split("/")[-1].strip()
                     if definitions.get(lookup_param):
-                        result = definitions[lookup_param]
+                        result = copy.deepcopy(definitions[lookup_param])
                         item.pop("$ref")
                         if item.get("description") and result.get("description"):
-                            if isinstance(item["description"], list):
-                                item["description"].extend(result.pop("description"))
-                                item["description"] = list(
-                                    Description.normalize(
-                                        item["description"], self.definitions
-                                    )
-                                )
-                            else:
-                                item["description"] += result.pop("description")
-                                item["description"] = list(
-                                    Description.normalize(
-                                        item["description"], self.definitions
-                                    )
-                                )
+                            description = Description.normalize(
+                                item["description"], self.definitions, self.vocabulary()
+                            )
+                            for sentence in Description.normalize(
+                                result.pop("description"),
+                                self.definitions,
+                                self.vocabulary(),
+                            ):
+                                if sentence not in description:
+                                    description.append(sentence)
+                            item["description"] = description
 
                         item.update(result)
                         options[key] = item
@@ -201,54 +257,57 @@ class Documentation:
                     options[key] = python_type(options[key])
                 if key == "description":
                     options[key] = list(
-                        Description.normalize(options[key], self.definitions)
+                        Description.normalize(
+                            options[key], self.definitions, self.vocabulary()
+                        )
                     )
                 if key == "const":
                     options["default"] = options.pop(key)
 
-    def cleanup_required(self, a_dict: Iterable):
-        a_dict_copy = copy.copy(a_dict)
-
-        if not isinstance(a_dict, dict):
-            return a_dict
-
-        for k, v in a_dict_copy.items():
-            if isinstance(v, dict):
-                if "items" in a_dict[k]:
-                    if a_dict[k]["items"].get("type"):
-                        a_dict[k]["elements"] = python_type(
-                            a_dict_copy[k]["items"].pop("type")
-                        )
-                    a_dict[k] = dict(a_dict_copy[k], **a_dict[k].pop("items"))
-                    v = a_dict[k]
-
-                if "required" in v and isinstance(v["required"], list):
-                    a_dict[k].pop("required")
+    @staticmethod
+    def cleanup_required(value: Dict) -> Dict:
+        """Return value with the items of the arrays merged into it and no required list.
 
-            self.cleanup_required(a_dict[k])
+        The arrays of arrays are merged down to the innermost items, their
+        type becomes the elements of the array.
+        """
+        value = dict(value)
+        while "items" in value:
+            items = dict(value.pop("items"))
+            if items.get("type"):
+                value["elements"] = python_type(items.pop("type"))
+            value.update(items)
+        if "required" in value and isinstance(value["required"], list):
+            value.pop("required")
+        return value
+
+    def document(
+        self, options: Dict, described: bool = False, completed: bool = False
+    ) -> Dict:
+        """Return the documentation of options.
+
+        The items of the arrays are merged into them, the scrubbed keys are
+        dropped and the keys are converted to snake case.
+        When described is set, a default description is added if needed.
+        When completed is set, the dict values get described.
+        """
+        documentation: Dict = {}
+        for key, value in options.items():
+            if key in self.scrubbed_keys:
+                continue
+            name = camel_to_snake(key)
+            if isinstance(value, dict):
+                value = self.document(
+                    self.cleanup_required(value),
+                    described=completed,
+                    completed=described or (completed and name == "suboptions"),
+                )
+            documentation[name] = value
+        if described and "description" not in documentation:
+            documentation["description"] = [MISSING_DESCRIPTION]
+        return documentation
 
     def preprocess(self) -> Iterable:
-        list_of_keys_to_remove = [
-            "additionalProperties",
-            "insertionOrder",
-            "uniqueItems",
-            "pattern",
-            "examples",
-            "maxLength",
-            "minLength",
-            "format",
-            "minimum",
-            "maximum",
-            "patternProperties",
-            "maxItems",
-            "minItems",
-        ]
-        self.replace_keys(self.options, self.definitions)
-        self.cleanup_required(self.options)
-        sanitized_options: Iterable = camel_to_snake(
-            scrub_keys(self.options, list_of_keys_to_remove)
-        )
-
         """
         For all the options with a missing description field returned by the API
         we make sure to add "description": "Not Provided." to allow
@@ -261,11 +320,9 @@ class Documentation:
         ERROR! Unable to retrieve documentation from 'amazon.cloud.module_name' due to:
         All (sub-)options and return values must have a 'description' field
         """
-        sanitized_options: Iterable = ensure_description(
-            sanitized_options, "description"
-        )
-
-        return sanitized_options
+        self._vocabulary = None
+        self.replace_keys(self.options, self.definitions)
+        return self.document(self.options, completed=True)
 
 
 def generate_runtime_yml(requires_ansible, collection, module_list):
@@ -384,7 +441,7 @@ def generate_documentation(
             "type": "str",
         }
 
-    module_from_config = get_module_from_config(module_name, target_dir)
+    module_from_config = ModuleConfig.load(target_dir).get(module_name)
     if module_from_config and "documentation" in module_from_config:
         for k, v in module_from_config["documentation"].items():
             documentation[k] = v
@@ -392,7 +449,50 @@ def generate_documentation(
     return documentation
 
 
-class CloudFormationWrapper:
+class SchemaSource(abc.ABC):
+    """Where the CloudFormation resource schemas are read from.
+
+    A source returns the raw schema of a type, as describe-type does, and
+    the version of the types it knows about, as list-types does.
+    """
+
+    @abc.abstractmethod
+    def generate_docs(self, type_name: str) -> str:
+        """Return the raw schema of type_name."""
+
+    def list_type_versions(self) -> Dict[str, str]:
+        return {}
+
+    def fetch_schemas(
+        self, type_names: Iterable[str], workers: int = 8
+    ) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """Read the schema of several types, with up to `workers` concurrent calls.
+
+        The source is shared by the threads, e.g: the retry configuration of
+        the boto3 client deals with the throttling. Return the schemas and the
+        errors, both indexed by type name in the order of type_names.
+        """
+
+        def fetch(type_name: str) -> Tuple[str, str]:
+            try:
+                return self.generate_docs(type_name), None
+            except Exception:
+                return None, traceback.format_exc()
+
+        type_names = list(type_names)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(fetch, type_names))
+
+        schemas, errors = {}, {}
+        for type_name, (schema, error) in zip(type_names, results):
+            if error:
+                errors[type_name] = error
+            else:
+                schemas[type_name] = schema
+        return schemas, errors
+
+
+class CloudFormationWrapper(SchemaSource):
     """Encapsulates Amazon CloudFormation operations."""
 
     def __init__(self, client):
@@ -412,3 +512,48 @@ class CloudFormationWrapper:
         response = self.client.describe_type(Type="RESOURCE", TypeName=type_name)
 
         return response.get("Schema")
+
+    def list_type_versions(self) -> Dict[str, str]:
+        """Return the version of the public AWS resource types, by type name.
+
+        Equivalent to
+        aws cloudformation list-types \
+            --visibility PUBLIC --type RESOURCE --filters Category=AWS_TYPES
+        """
+        versions = {}
+        paginator = self.client.get_paginator("list_types")
+        for page in paginator.paginate(
+            Visibility="PUBLIC", Type="RESOURCE", Filters={"Category": "AWS_TYPES"}
+        ):
+            for summary in page["TypeSummaries"]:
+                last_updated = summary.get("LastUpdated")
+                versions[summary["TypeName"]] = "{0}@{1}".format(
+                    summary.get("DefaultVersionId", ""),
+                    last_updated.isoformat() if last_updated else "",
+                )
+        return versions
+
+
+class DirectorySchemaSource(SchemaSource):
+    """Read the schemas from a directory, one <Vendor_Service_Resource>.json file per type.
+
+    The version of a type is the checksum of its file, so a copy of a previous
+    download can be used to refresh the schemas without any network access.
+    """
+
+    def __init__(self, path):
+        self.path = pathlib.Path(path)
+
+    def schema_file(self, type_name: str) -> pathlib.Path:
+        return self.path / (type_name.replace("::", "_") + ".json")
+
+    def generate_docs(self, type_name: str) -> str:
+        return self.schema_file(type_name).read_text()
+
+    def list_type_versions(self) -> Dict[str, str]:
+        versions = {}
+        for schema_file in sorted(self.path.glob("*.json")):
+            parts = schema_file.stem.split("_")
+            if len(parts) == 3:
+                versions["::".join(parts)] = file_sha256(schema_file)
+        return versions
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+
+"""Read the string blocks of a module (e.g: DOCUMENTATION) without importing it.
+
+Only the standard library is needed, the filter plugins import it.
+"""
+
+import ast
+from typing import Optional
+
+
+def _get_module_block_with_redbaron(content: str, name: str) -> Optional[str]:
+    # Slow, only used for the files the ast module cannot parse
+    import baron
+    import redbaron
+
+    ast_file = redbaron.RedBaron(content)
+    block = ast_file.find("assignment", target=lambda x: x.dumps() == name)
+    if not block or not block.value:
+        return None
+    return block.value.to_python()
+
+
+def get_module_block(content: str, name: str) -> Optional[str]:
+    """Return the value of a string assigned in a module (e.g: DOCUMENTATION).
+
+    Raise SyntaxError if the module cannot be parsed.
+    """
+    try:
+        tree = ast.parse(content)
+    except SyntaxError as e:
+        import baron
+
+        try:
+            return _get_module_block_with_redbaron(content, name)
+        except baron.BaronError:
+            raise e from None
+
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Assign) or not isinstance(node.targets[0], ast.Name):
+            continue
+        if node.targets[0].id == name:
+            try:
+                value = ast.literal_eval(node.value)
+            except ValueError:
+                return None
+            return value if isinstance(value, str) else None
+    return None
@@ -2,31 +2,109 @@
 
 
 from dataclasses import dataclass
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import autoflake
+import cProfile
+import black
 import jinja2
-import baron
-import redbaron
 import yaml
 import re
 import copy
+import hashlib
+import io
+import json
+import mmap
+import os
 import subprocess
+import time
+import warnings
 from pathlib import Path
+from collections import defaultdict
+from collections.abc import Mapping
+from contextlib import contextmanager
 from functools import lru_cache
+from ansible.module_utils.parsing.convert_bool import boolean
+from ansible_collections.ansible.content_builder.plugins.plugin_utils.cloud_utils.module_blocks import (
+    get_module_block,
+)
+
+
+@lru_cache(maxsize=None)
+def jinja2_environment(role_path: str, collection: str, target_dir: str) -> jinja2.Environment:
+    """Return the Environment of the templates of a collection.
+
+    The Environment keeps the compiled templates in memory, and in a bytecode
+    cache under the cache directory of the target collection, so the next
+    runs don't have to compile them again.
+    """
+    templateLoader = jinja2.FileSystemLoader(role_path + "/templates/module_directory/" + collection)
+    bytecode_dir = get_cache_dir(target_dir) / "jinja2"
+    bytecode_dir.mkdir(parents=True, exist_ok=True)
+    return jinja2.Environment(
+        loader=templateLoader, bytecode_cache=jinja2.FileSystemBytecodeCache(str(bytecode_dir))
+    )
 
 
 def jinja2_renderer(
-    template_file: str, role_path: Path, collection: str, **kwargs: Dict[str, Any]
+    template_file: str, role_path: Path, collection: str, target_dir: str, **kwargs: Dict[str, Any]
 ) -> str:
 
-    templateLoader = jinja2.FileSystemLoader(role_path + "/templates/module_directory/" + collection)
-    templateEnv = jinja2.Environment(loader=templateLoader)
+    templateEnv = jinja2_environment(str(role_path), collection, str(target_dir))
     template = templateEnv.get_template(template_file)
     return template.render(kwargs)
 
 
-def format_documentation(documentation: Any) -> str:
-    yaml.Dumper.ignore_aliases = lambda *args: True  # type: ignore
+class _Fields(list):
+    """(key, value) pairs dumped as a mapping, in this order."""
+
+
+class _DocumentationRepresenter:
+    def ignore_aliases(self, data: Any) -> bool:
+        # the values shared by several options are repeated
+        return True
+
+    def represent_fields(self, data: _Fields) -> yaml.Node:
+        return self.represent_mapping("tag:yaml.org,2002:map", data)
+
+
+class DocumentationDumper(_DocumentationRepresenter, yaml.SafeDumper):
+    """Dump the DOCUMENTATION of the modules."""
+
+
+DocumentationDumper.add_representer(_Fields, DocumentationDumper.represent_fields)
 
+if getattr(yaml, "__with_libyaml__", False):
+
+    class CDocumentationDumper(_DocumentationRepresenter, yaml.CSafeDumper):
+        """Dump the DOCUMENTATION of the modules with libyaml.
+
+        libyaml does not fold the long double quoted strings, nor write the
+        empty and long keys like the Python emitter. It is only used when
+        all the strings are printable ASCII, and the keys are short enough.
+        """
+
+    CDocumentationDumper.add_representer(_Fields, CDocumentationDumper.represent_fields)
+else:
+    CDocumentationDumper = None
+
+_PRINTABLE_ASCII = re.compile(r"[ -~]*")
+
+
+def _same_with_libyaml(data: Any) -> bool:
+    """Return if libyaml and the Python emitter dump data the same way."""
+    if isinstance(data, str):
+        return _PRINTABLE_ASCII.fullmatch(data) is not None
+    if isinstance(data, dict):
+        return all(
+            isinstance(k, str) and 0 < len(k) < 64 and _same_with_libyaml(k) and _same_with_libyaml(v)
+            for k, v in data.items()
+        )
+    if isinstance(data, (list, tuple)):
+        return all(_same_with_libyaml(i) for i in data)
+    return True
+
+
+def format_documentation(documentation: Any) -> str:
     def _sanitize(input: Any) -> Any:
         if isinstance(input, str):
             return input.replace("':'", ":")
@@ -50,7 +128,7 @@ def format_documentation(documentation: Any) -> str:
         "seealso",
         "notes",
     ]
-    final = "r'''\n"
+    fields = _Fields()
     for i in keys:
         if i not in documentation:
             continue
@@ -58,30 +136,64 @@ def format_documentation(documentation: Any) -> str:
             sanitized = _sanitize(documentation[i])
         else:
             sanitized = documentation[i]
-        final += yaml.dump({i: sanitized}, indent=4, default_flow_style=False)
+        fields.append((i, sanitized))
+    dumper = DocumentationDumper
+    if CDocumentationDumper and all(_same_with_libyaml(v) for _, v in fields):
+        dumper = CDocumentationDumper
+    final = "r'''\n"
+    if fields:
+        final += yaml.dump(fields, Dumper=dumper, indent=4, default_flow_style=False)
     final += "'''"
     return final
 
 
 def indent(text_block: str, indent: int = 0) -> str:
-    result: str = ""
+    prefix = " " * indent
+    return "".join(prefix + line + "\n" for line in text_block.split("\n"))
+
+
+def format_argument_spec(options: Iterable[Tuple[str, Dict[str, Any]]]) -> str:
+    """Return the statements that fill the argument_spec of a module.
 
-    for line in text_block.split("\n"):
-        result += " " * indent
-        result += line
-        result += "\n"
-    return result
+    options are (name, spec) pairs, the specs are only made of Python
+    literals and are written with repr().
+    """
+    return "".join(f"\nargument_spec['{name}'] = {spec!r}" for name, spec in options)
+
+
+class ModuleConfig:
+    """The content of a modules.yaml file, indexed by module name."""
+
+    # path -> (mtime, ModuleConfig)
+    _loaded: Dict[str, Tuple[int, "ModuleConfig"]] = {}
 
+    def __init__(self, entries: List[Dict[str, Any]]):
+        self.entries = entries
+        self._index: Dict[str, Dict[str, Any]] = {}
+        for entry in entries:
+            for module, config in entry.items():
+                self._index.setdefault(module, config or {})
 
-def get_module_from_config(module: str, target_dir: Path) -> Dict[str, Any]:
+    @classmethod
+    def load(cls, target_dir: Path) -> "ModuleConfig":
+        """Return the configuration from target_dir/modules.yaml.
 
-    module_file = Path(target_dir) / "modules.yaml"
-    raw_content = module_file.read_text()
+        The file is only parsed again if its mtime has changed.
+        """
+        module_file = Path(target_dir) / "modules.yaml"
+        key = str(module_file.resolve())
+        mtime = module_file.stat().st_mtime_ns
+        if key not in cls._loaded or cls._loaded[key][0] != mtime:
+            entries = yaml.safe_load(module_file.read_text())
+            cls._loaded[key] = (mtime, cls(entries))
+        return cls._loaded[key][1]
 
-    for i in yaml.safe_load(raw_content):
-        if module in i:
-            return i[module] or {}
-    raise KeyError
+    def __contains__(self, module: str) -> bool:
+        return module in self._index
+
+    def get(self, module: str) -> Dict[str, Any]:
+        """Return the configuration of a module, raise KeyError if it's not listed."""
+        return copy.deepcopy(self._index[module])
 
 
 def python_type(value: str) -> str:
@@ -98,6 +210,222 @@ def python_type(value: str) -> str:
     return TYPE_MAPPING.get(value, value)
 
 
+_JSON_WHITESPACE = re.compile(rb"[ \t\n\r]*")
+_JSON_STRING = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"')
+_JSON_SCALAR = re.compile(rb"-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][-+]?[0-9]+)?|true|false|null")
+# what is between two brackets of a container: anything but a bracket, or a string
+_JSON_CONTAINER_CONTENT = re.compile(rb'(?:[^"\[\]{}]+|"[^"\\]*(?:\\.[^"\\]*)*")*')
+
+
+def _skip_json_value(buffer: mmap.mmap, pos: int) -> int:
+    """Return the end of the value that starts at pos.
+
+    The content of the objects and arrays is not validated, only their
+    brackets are matched. It is checked when the value is decoded.
+    """
+    char = buffer[pos:pos + 1]
+    if char == b'"':
+        match = _JSON_STRING.match(buffer, pos)
+    elif char not in (b"{", b"["):
+        match = _JSON_SCALAR.match(buffer, pos)
+    else:
+        depth = 0
+        while char:
+            depth += 1 if char in (b"{", b"[") else -1
+            pos += 1
+            if depth == 0:
+                return pos
+            pos = _JSON_CONTAINER_CONTENT.match(buffer, pos).end()
+            char = buffer[pos:pos + 1]
+        raise json.JSONDecodeError("Unterminated container", "", pos)
+    if match is None:
+        raise json.JSONDecodeError("Expecting value", "", pos)
+    return match.end()
+
+
+def _index_json_object(buffer: mmap.mmap, pos: int, depth: int) -> Tuple[int, Dict[str, Any]]:
+    """Return the end of the object that starts at pos and the (start, end) of its members.
+
+    The members that are objects are indexed too, up to depth levels. The
+    bytes are scanned in place, only the keys are decoded.
+    """
+    members: Dict[str, Any] = {}
+    pos = _JSON_WHITESPACE.match(buffer, pos + 1).end()
+    if buffer[pos:pos + 1] == b"}":
+        return pos + 1, members
+    while True:
+        match = _JSON_STRING.match(buffer, pos)
+        if match is None:
+            raise json.JSONDecodeError("Expecting property name enclosed in double quotes", "", pos)
+        key = json.loads(match.group())
+        pos = _JSON_WHITESPACE.match(buffer, match.end()).end()
+        if buffer[pos:pos + 1] != b":":
+            raise json.JSONDecodeError("Expecting ':' delimiter", "", pos)
+        pos = _JSON_WHITESPACE.match(buffer, pos + 1).end()
+        if depth > 1 and buffer[pos:pos + 1] == b"{":
+            end, value = _index_json_object(buffer, pos, depth - 1)
+        else:
+            end = _skip_json_value(buffer, pos)
+            value = (pos, end)
+        members[key] = value
+        pos = _JSON_WHITESPACE.match(buffer, end).end()
+        if buffer[pos:pos + 1] == b"}":
+            return pos + 1, members
+        if buffer[pos:pos + 1] != b",":
+            raise json.JSONDecodeError("Expecting ',' delimiter", "", pos)
+        pos = _JSON_WHITESPACE.match(buffer, pos + 1).end()
+
+
+class LazyJSONObject(Mapping):
+    """A JSON object read from a memory-mapped file, its members are decoded on access.
+
+    Use LazyJSONObject.load() or load_schema(). The members that are objects,
+    up to depth levels, are LazyJSONObject too. The other members are
+    decoded the first time they are accessed and then kept.
+    """
+
+    def __init__(
+        self, buffer: mmap.mmap, members: Dict[str, Any], decode: Callable[[bytes], Any] = json.loads
+    ):
+        self._buffer = buffer
+        self._decode = decode
+        # key -> (start, end) in the buffer, or the members of a lazy object
+        self._members = {
+            key: LazyJSONObject(buffer, value, decode) if isinstance(value, dict) else value
+            for key, value in members.items()
+        }
+        self._decoded: Dict[str, Any] = {}
+
+    @classmethod
+    def load(cls, path: str, depth: int = 2) -> "LazyJSONObject":
+        with open(path, "rb") as fd:
+            buffer = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+        pos = _JSON_WHITESPACE.match(buffer).end()
+        if buffer[pos:pos + 1] != b"{":
+            raise json.JSONDecodeError("Expecting a JSON object", "", pos)
+        end, members = _index_json_object(buffer, pos, depth)
+        if _JSON_WHITESPACE.match(buffer, end).end() != len(buffer):
+            raise json.JSONDecodeError("Extra data", "", end)
+        return cls(buffer, members)
+
+    def __getitem__(self, key: str) -> Any:
+        member = self._members[key]
+        if isinstance(member, LazyJSONObject):
+            return member
+        if key not in self._decoded:
+            self._decoded[key] = self._decode(self._buffer[member[0]:member[1]])
+        return self._decoded[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._members)
+
+    def __len__(self) -> int:
+        return len(self._members)
+
+
+# Increase it when the format of the snapshots changes
+SNAPSHOT_VERSION = 2
+
+
+def snapshot_path(spec_file: str, cache_dir: str) -> Path:
+    return Path(cache_dir) / "snapshots" / f"{Path(spec_file).name}.snapshot.json"
+
+
+def compile_schema(
+    spec_file: str,
+    cache_dir: str,
+    depth: int = 2,
+    indexer: Optional[Callable[[LazyJSONObject], Any]] = None,
+    index_key: Any = None,
+) -> Path:
+    """Write the snapshot of a JSON spec file in cache_dir, see load_schema().
+
+    The snapshot is a JSON document with the offsets of the members of the
+    spec in the file, up to depth levels, and the result of indexer(content),
+    if any. It only holds data, the spec file is still the one decoded.
+    """
+    content = LazyJSONObject.load(spec_file, depth)
+    index = indexer(content) if indexer else None
+    stat = os.stat(spec_file)
+
+    def members(lazy: LazyJSONObject) -> Dict[str, Any]:
+        return {
+            key: members(member) if isinstance(member, LazyJSONObject) else list(member)
+            for key, member in lazy._members.items()
+        }
+
+    snapshot = snapshot_path(spec_file, cache_dir)
+    header = {
+        "version": SNAPSHOT_VERSION,
+        "source": {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": file_sha256(spec_file)},
+        "depth": depth,
+        "index_key": index_key,
+        "index": index,
+        "members": members(content),
+    }
+    atomic_write_text(snapshot, json.dumps(header, separators=(",", ":")))
+    return snapshot
+
+
+def _read_snapshot(spec_file: str, cache_dir: str, depth: int, index_key: Any) -> Optional[Dict[str, Any]]:
+    snapshot = snapshot_path(spec_file, cache_dir)
+    try:
+        header = json.loads(snapshot.read_bytes())
+    except (OSError, ValueError):
+        return None
+    if not isinstance(header, dict):
+        return None
+    if (header.get("version"), header.get("depth"), header.get("index_key")) != (SNAPSHOT_VERSION, depth, index_key):
+        return None
+
+    # a JSON file with the same mtime and size has not been modified, if
+    # only the mtime has changed (e.g: new checkout) compare the content
+    stat = os.stat(spec_file)
+    source = header["source"]
+    if stat.st_size != source["size"]:
+        return None
+    if stat.st_mtime_ns != source["mtime_ns"]:
+        if file_sha256(spec_file) != source["sha256"]:
+            return None
+        # the next runs do not have to hash the file again
+        source["mtime_ns"] = stat.st_mtime_ns
+        try:
+            atomic_write_text(snapshot, json.dumps(header, separators=(",", ":")))
+        except OSError as e:
+            warnings.warn(f"Cannot update the snapshot of {spec_file}: {e}")
+    return header
+
+
+def load_schema(
+    spec_file: str,
+    depth: int = 2,
+    indexer: Optional[Callable[[LazyJSONObject], Any]] = None,
+    index_key: Any = None,
+    cache_dir: Optional[str] = None,
+) -> Tuple[LazyJSONObject, Any]:
+    """Return the content of a JSON spec file and its index, see compile_schema().
+
+    With cache_dir, the up to date snapshot of the file is used, or compiled
+    if possible, so the file does not have to be scanned and indexed again.
+    A warning is raised when the snapshot cannot be written.
+    """
+    header = None
+    if cache_dir:
+        header = _read_snapshot(spec_file, cache_dir, depth, index_key)
+        if header is None:
+            try:
+                compile_schema(spec_file, cache_dir, depth, indexer, index_key)
+                header = _read_snapshot(spec_file, cache_dir, depth, index_key)
+            except OSError as e:
+                warnings.warn(f"Cannot write the snapshot of {spec_file}: {e}")
+    if header is None:
+        content = LazyJSONObject.load(spec_file, depth)
+        return content, indexer(content) if indexer else None
+    with open(spec_file, "rb") as fd:
+        buffer = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+    return LazyJSONObject(buffer, header["members"]), header["index"]
+
+
 def run_git(git_dir: str, *args: List[Any]) -> List[Any]:
     cmd = [
         "git",
@@ -110,130 +438,321 @@ def run_git(git_dir: str, *args: List[Any]) -> List[Any]:
     return r.stdout.rstrip().split("\n")
 
 
+def cat_file_batch(git_dir: str, objects: Iterable[str]) -> Iterator[Tuple[str, Optional[bytes]]]:
+    """Stream the content of objects from a single git cat-file --batch process."""
+    proc = subprocess.Popen(
+        ["git", "--git-dir", git_dir, "cat-file", "--batch"],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+    )
+    try:
+        for obj in objects:
+            proc.stdin.write(f"{obj}\n".encode())
+            proc.stdin.flush()
+            header = proc.stdout.readline().split()
+            if len(header) != 3:
+                # <object> missing
+                yield obj, None
+                continue
+            content = proc.stdout.read(int(header[2]))
+            proc.stdout.read(1)  # trailing LF
+            yield obj, content
+    finally:
+        proc.stdin.close()
+        proc.stdout.close()
+        proc.wait()
+
+
+def get_documentation_options(content: str, origin: str = "module") -> Optional[List[str]]:
+    """Return the options listed in the DOCUMENTATION block of a module."""
+    try:
+        documentation = get_module_block(content, "DOCUMENTATION")
+    except SyntaxError as e:
+        print(f"Failed to parse {origin}. {e}")
+        return None
+    if not documentation:
+        print(f"Cannot find DOCUMENTATION block for {origin}")
+        return None
+    doc_content = yaml.safe_load(documentation)
+    return list(doc_content.get("options") or {})
+
+
+def get_cache_dir(target_dir: str) -> Path:
+    """Where the builder keeps its caches in the target collection."""
+    return Path(target_dir) / ".cache" / "content_builder"
+
+
+def atomic_write_text(path: str, content: str) -> None:
+    """Write a file through a temporary file, a reader never sees a partial content."""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = Path(f"{path}.{os.getpid()}.tmp")
+    tmp_file.write_text(content)
+    os.replace(tmp_file, path)
+
+
 @lru_cache(maxsize=None)
-def file_by_tag(git_dir: str) -> Dict[str, Any]:
-    tags = run_git(git_dir, "tag")
+def black_mode(target_dir: str) -> black.Mode:
+    """Return the black configuration of the collection, from its pyproject.toml."""
+    pyproject = Path(target_dir) / "pyproject.toml"
+    config = black.parse_pyproject_toml(str(pyproject)) if pyproject.exists() else {}
+    mode = {}
+    if "line_length" in config:
+        mode["line_length"] = int(config["line_length"])
+    if config.get("target_version"):
+        mode["target_versions"] = {
+            black.TargetVersion[version.upper()] for version in config["target_version"]
+        }
+    if "skip_string_normalization" in config:
+        mode["string_normalization"] = not config["skip_string_normalization"]
+    if "skip_magic_trailing_comma" in config:
+        mode["magic_trailing_comma"] = not config["skip_magic_trailing_comma"]
+    if "preview" in config:
+        mode["preview"] = config["preview"]
+    return black.Mode(**mode)
+
+
+def format_python(content: str, target_dir: str) -> str:
+    """Format Python code the way `autoflake --remove-all-unused-imports` and `black` do."""
+    content = autoflake.fix_code(content, remove_all_unused_imports=True)
+    try:
+        return black.format_file_contents(content, fast=False, mode=black_mode(str(target_dir)))
+    except black.NothingChanged:
+        return content
+
+
+def write_if_changed(path: str, content: str) -> bool:
+    """Write content to path unless the file already has this content.
+
+    Return True if the file has been written. An unchanged file keeps its
+    mtime, so the tools that run after the generation can skip it.
+    """
+    path = Path(path)
+    if path.is_symlink():
+        path = path.resolve()
+    try:
+        if path.read_text() == content:
+            return False
+    except (FileNotFoundError, UnicodeDecodeError):
+        pass
+    atomic_write_text(path, content)
+    return True
 
-    files_by_tag: Dict[str, Any] = {}
-    for tag in tags:
-        files_by_tag[tag] = run_git(git_dir, "ls-tree", "-r", "--name-only", tag)
 
-    return files_by_tag
+class OutputFiles:
+    """Write the generated files of a collection, see write_if_changed().
 
+    The Python files are formatted first, see format_python(). The paths of
+    the files that have been written, relative to the root of the
+    collection, are listed in changed.
+    """
 
-def get_module_added_ins(module_name: str, git_dir: str) -> Dict[str, Any]:
-    added_ins: Dict[str, Any] = {"module": None, "options": {}}
-    module = f"plugins/modules/{module_name}.py"
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.changed: List[str] = []
 
-    for tag, files in file_by_tag(git_dir).items():
-        if "rc" in tag:
-            continue
-        if module in files:
-            if not added_ins["module"]:
-                added_ins["module"] = tag
-            content = "\n".join(
-                run_git(
-                    git_dir,
-                    "cat-file",
-                    "--textconv",
-                    f"{tag}:{module}",
-                )
-            )
-            try:
-                ast_file = redbaron.RedBaron(content)
-            except baron.BaronError as e:
-                print(f"Failed to parse {tag}:plugins/modules/{module_name}.py. {e}")
-                continue
-            doc_block = ast_file.find(
-                "assignment", target=lambda x: x.dumps() == "DOCUMENTATION"
-            )
-            if not doc_block or not doc_block.value:
-                print(f"Cannot find DOCUMENTATION block for module {module_name}")
-            doc_content = yaml.safe_load(doc_block.value.to_python())
-            for option in doc_content["options"]:
-                if option not in added_ins["options"]:
-                    added_ins["options"][option] = tag
+    def record(self, path: str) -> None:
+        path = Path(path)
+        try:
+            path = path.relative_to(self.root)
+        except ValueError:
+            pass
+        self.changed.append(str(path))
+
+    def write(self, path: str, content: str) -> bool:
+        if Path(path).suffix == ".py":
+            content = format_python(content, self.root)
+        if not write_if_changed(path, content):
+            return False
+        self.record(path)
+        return True
 
-    return added_ins
+    @contextmanager
+    def open(self, path: str) -> Iterator[io.StringIO]:
+        """Like Path.open("w"), the file is only written at the end of the block."""
+        buffer = io.StringIO()
+        yield buffer
+        self.write(path, buffer.getvalue())
 
 
-def scrub_keys(
-    a_dict: Dict[str, Any], list_of_keys_to_remove: List[str]
-) -> Dict[str, Any]:
-    """Filter a_dict by removing unwanted keys: values listed in list_of_keys_to_remove"""
-    if not isinstance(a_dict, dict):
-        return a_dict
-    return {
-        k: v
-        for k, v in (
-            (k, scrub_keys(v, list_of_keys_to_remove)) for k, v in a_dict.items()
-        )
-        if k not in list_of_keys_to_remove
-    }
+def fingerprint(*data: Any) -> str:
+    """Return a hash of JSON serializable data, the key order does not matter."""
+    serialized = json.dumps(data, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(serialized.encode()).hexdigest()
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fd:
+        for chunk in iter(lambda: fd.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
 
 
-def ignore_description(a_dict: Dict[str, Any]) -> Dict[str, Any]:
+def hash_files(paths: Iterable[Path]) -> Dict[str, str]:
+    return {str(path): file_sha256(path) for path in paths}
+
+
+class BuildManifest:
+    """The fingerprint of the inputs of each module of the last build.
+
+    A module whose inputs have the same fingerprint doesn't need to be
+    rendered again.
     """
-    Filter a_dict by removing description fields.
-    Handle when 'description' is a module suboption.
+
+    def __init__(self, path: Path, modules: Optional[Dict[str, str]] = None):
+        self.path = Path(path)
+        self.modules: Dict[str, str] = modules or {}
+
+    @classmethod
+    def load(cls, target_dir: str) -> "BuildManifest":
+        path = get_cache_dir(target_dir) / "build_manifest.json"
+        modules = {}
+        if path.exists():
+            try:
+                modules = json.loads(path.read_text()).get("modules", {})
+            except ValueError:
+                print(f"Ignoring the invalid build manifest {path}")
+        return cls(path, modules)
+
+    def is_up_to_date(self, name: str, module_fingerprint: Optional[str]) -> bool:
+        return module_fingerprint is not None and self.modules.get(name) == module_fingerprint
+
+    def update(self, name: str, module_fingerprint: Optional[str]) -> None:
+        if module_fingerprint is None:
+            self.modules.pop(name, None)
+        else:
+            self.modules[name] = module_fingerprint
+
+    def save(self) -> None:
+        atomic_write_text(self.path, json.dumps({"modules": self.modules}, indent=1, sort_keys=True))
+
+
+def _list_tag_modules(git_dir: str, tag: str, origins: Dict[str, str]) -> Dict[str, Optional[str]]:
+    modules: Dict[str, Optional[str]] = {}
+    for line in run_git(git_dir, "ls-tree", tag, "plugins/modules/"):
+        # <mode> SP <type> SP <object> TAB <file>
+        if "\t" not in line:
+            continue
+        meta, path = line.split("\t", 1)
+        mode, obj_type, obj = meta.split()
+        if obj_type != "blob" or not path.endswith(".py"):
+            continue
+        module_name = path[len("plugins/modules/"):-len(".py")]
+        # symlinks are listed but their content is not parsed
+        modules[module_name] = obj if mode != "120000" else None
+        origins.setdefault(obj, f"{tag}:{path}")
+    return modules
+
+
+def get_modules_by_tag(
+    git_dir: str, cache_file: Optional[str] = None
+) -> Dict[str, Dict[str, Optional[List[str]]]]:
+    """Return the modules of each tag with the options they document.
+
+    {tag: {module_name: [option, ...]}}, the tags are in the order of `git tag`.
+    A file shared by several tags is only read and parsed once, and all the
+    files are read through the same git cat-file process.
+
+    With cache_file, the result of each tag is stored on disk with the SHA
+    the tag points to. The next calls only process the new tags and the
+    tags that have been moved.
     """
-    a_dict_copy = copy.copy(a_dict)
-    if not isinstance(a_dict, dict):
-        return a_dict
-
-    for k, v in a_dict_copy.items():
-        if k == "description":
-            if isinstance(v, dict):
-                ignore_description(v)
-            else:
-                a_dict.pop(k)
-        ignore_description(v)
+    cache: Dict[str, Any] = {}
+    if cache_file and Path(cache_file).exists():
+        try:
+            cache = json.loads(Path(cache_file).read_text()).get("tags", {})
+        except ValueError:
+            print(f"Ignoring the invalid cache file {cache_file}")
+
+    tags: Dict[str, Dict[str, Any]] = {}
+    modules_by_tag: Dict[str, Dict[str, Optional[str]]] = {}
+    origins: Dict[str, str] = {}
+    for line in run_git(git_dir, "for-each-ref", "--format=%(refname:strip=2) %(objectname)", "refs/tags"):
+        if not line:
+            continue
+        tag, sha = line.rsplit(" ", 1)
+        if "rc" in tag:
+            continue
+        if cache.get(tag, {}).get("sha") == sha:
+            tags[tag] = cache[tag]
+            continue
+        tags[tag] = {"sha": sha, "modules": {}}
+        modules_by_tag[tag] = _list_tag_modules(git_dir, tag, origins)
+
+    blobs = sorted({obj for modules in modules_by_tag.values() for obj in modules.values() if obj})
+    options_by_blob: Dict[str, Optional[List[str]]] = {}
+    for obj, content in cat_file_batch(git_dir, blobs):
+        if content is not None:
+            options_by_blob[obj] = get_documentation_options(content.decode(), origins[obj])
+
+    for tag, modules in modules_by_tag.items():
+        tags[tag]["modules"] = {module: options_by_blob.get(obj) for module, obj in modules.items()}
 
+    if cache_file and (modules_by_tag or tags.keys() != cache.keys()):
+        atomic_write_text(cache_file, json.dumps({"tags": tags}, indent=1, sort_keys=True))
 
-def ensure_description(
-    element: Dict[str, Any], *keys: List[Any], default: str = "Not Provived."
+    return {tag: data["modules"] for tag, data in tags.items()}
+
+
+@lru_cache(maxsize=None)
+def get_modules_history(git_dir: str, cache_file: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """Return the added_ins of every module of the collection, see get_module_added_ins()."""
+    history: Dict[str, Dict[str, Any]] = {}
+    for tag, modules in get_modules_by_tag(git_dir, cache_file).items():
+        for module, options in modules.items():
+            added_ins = history.setdefault(module, {"module": tag, "options": {}})
+            for option in options or []:
+                added_ins["options"].setdefault(option, tag)
+    return history
+
+
+def get_module_added_ins(
+    module_name: str, git_dir: str, cache_file: Optional[str] = None
 ) -> Dict[str, Any]:
+    """Return the first tag that ships the module and each of its options.
+
+    {"module": tag, "options": {option: tag}}
     """
-    Check if *keys (nested) exists in `element` (dict) and ensure it has the default value.
-    """
-    if isinstance(element, dict):
-        for key, value in element.items():
-            if key == "suboptions":
-                ensure_description(value, *keys)
+    history = get_modules_history(str(git_dir), str(cache_file) if cache_file else None)
+    if module_name not in history:
+        return {"module": None, "options": {}}
+    return copy.deepcopy(history[module_name])
+
+
+MISSING_DESCRIPTION = "Not Provived."
+
 
-            if isinstance(value, dict):
-                for akey in keys:
-                    if akey not in value:
-                        element[key][akey] = [default]
-                for k, v in value.items():
-                    ensure_description(v, *keys)
+# Cope with pluralized abbreviations such as TargetGroupARNs
+# that would otherwise be rendered target_group_ar_ns
+_PLURAL_ABBREVIATION = re.compile(r"[A-Z]{3,}s$")
+_UPPER = re.compile(r"[A-Z]")
+# Remainder of solution seems to be https://stackoverflow.com/a/1176023
+_FIRST_CAP = re.compile(r"(.)([A-Z][a-z]+)")
+_ALL_CAP = re.compile(r"([a-z0-9])([A-Z]+)")
 
-    return element
 
+def _prepend_underscore_and_lower(m: re.Match) -> str:
+    return "_" + m.group(0).lower()
 
+
+@lru_cache(maxsize=32768)
 def _camel_to_snake(name: str, reversible: bool = False) -> str:
-    def prepend_underscore_and_lower(m: str) -> str:
-        return "_" + m.group(0).lower()
+    """Convert a CamelCase name to snake_case.
 
-    if reversible:
-        upper_pattern = r"[A-Z]"
-    else:
-        # Cope with pluralized abbreviations such as TargetGroupARNs
-        # that would otherwise be rendered target_group_ar_ns
-        upper_pattern = r"[A-Z]{3,}s$"
+    The same property names come back in most of the resources of a
+    collection, the results are kept in a bounded cache shared by all of them.
+    """
+    upper_pattern = _UPPER if reversible else _PLURAL_ABBREVIATION
 
-    s1 = re.sub(upper_pattern, prepend_underscore_and_lower, name)
+    s1 = upper_pattern.sub(_prepend_underscore_and_lower, name)
     # Handle when there was nothing before the plural_pattern
     if s1.startswith("_") and not name.startswith("_"):
         s1 = s1[1:]
     if reversible:
         return s1
 
-    # Remainder of solution seems to be https://stackoverflow.com/a/1176023
-    first_cap_pattern = r"(.)([A-Z][a-z]+)"
-    all_cap_pattern = r"([a-z0-9])([A-Z]+)"
-    s2 = re.sub(first_cap_pattern, r"\1_\2", s1)
-    return re.sub(all_cap_pattern, r"\1_\2", s2).lower()
+    s2 = _FIRST_CAP.sub(r"\1_\2", s1)
+    return _ALL_CAP.sub(r"\1_\2", s2).lower()
 
 
 def camel_to_snake(data: Any) -> Any:
@@ -251,20 +770,143 @@ def camel_to_snake(data: Any) -> Any:
         return b_dict
 
 
+class Profiler:
+    """Record the time spent in the stages of a generation.
+
+    The stages are timed with stage(), and charged to the resource being
+    generated, if any, see resource(). Stages can be nested, the time of
+    the inner stage is also counted in the outer one. When the profiler is
+    disabled, stage() and resource() do nothing.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.stages: Dict[str, float] = defaultdict(float)
+        self.resources: Dict[str, Dict[str, float]] = {}
+        self.current_resource: Optional[str] = None
+
+    @contextmanager
+    def session(self, enabled: bool = True, profile_file: Optional[str] = None) -> Iterator["Profiler"]:
+        """Enable the profiler, and dump the cProfile stats to profile_file if set.
+
+        cProfile only sees the current process, the modules rendered by the
+        workers of render_modules() are not in the dump.
+        """
+        self.__init__()
+        self.enabled = enabled or bool(profile_file)
+        profile = cProfile.Profile() if profile_file else None
+        start = time.perf_counter()
+        if profile:
+            profile.enable()
+        try:
+            yield self
+        finally:
+            if profile:
+                profile.disable()
+                profile.dump_stats(profile_file)
+            self.stages["total"] = time.perf_counter() - start
+            self.enabled = False
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stages[name] += elapsed
+            if self.current_resource is not None:
+                resource = self.resources[self.current_resource]
+                resource[name] = resource.get(name, 0.0) + elapsed
+
+    @contextmanager
+    def resource(self, name: str) -> Iterator[Dict[str, float]]:
+        """Charge the stages to a resource, yield the timings of the resource."""
+        if not self.enabled:
+            yield {}
+            return
+        timings = self.resources.setdefault(name, {})
+        previous, self.current_resource = self.current_resource, name
+        start = time.perf_counter()
+        try:
+            yield timings
+        finally:
+            timings["total"] = timings.get("total", 0.0) + time.perf_counter() - start
+            self.current_resource = previous
+
+    def merge(self, name: str, timings: Dict[str, float]) -> None:
+        """Add the timings of a resource generated in another process."""
+        resource = self.resources.setdefault(name, {})
+        for stage, elapsed in timings.items():
+            resource[stage] = resource.get(stage, 0.0) + elapsed
+            if stage != "total":
+                self.stages[stage] += elapsed
+
+    def report(self) -> Dict[str, Any]:
+        """Return the timings, in seconds, as a JSON serializable dict.
+
+        The stages of the resources rendered in parallel add up the time
+        spent by all the workers, they can exceed the total.
+        """
+        return {
+            "stages": {k: round(v, 6) for k, v in sorted(self.stages.items())},
+            "resources": {
+                name: {k: round(v, 6) for k, v in sorted(timings.items())}
+                for name, timings in sorted(self.resources.items())
+            },
+        }
+
+
+# The profiler of the running action, see profiling()
+profiler = Profiler()
+
+
+@contextmanager
+def profiling(args: Dict[str, Any], result: Dict[str, Any]) -> Iterator[Profiler]:
+    """Profile an action if its profile or profile_file argument is set.
+
+    The CONTENT_BUILDER_PROFILE and CONTENT_BUILDER_PROFILE_FILE environment
+    variables are used when the arguments are not set. The report is added
+    to the result of the action, under the profile key.
+    """
+    enabled = boolean(args.get("profile", os.environ.get("CONTENT_BUILDER_PROFILE", False)))
+    profile_file = args.get("profile_file") or os.environ.get("CONTENT_BUILDER_PROFILE_FILE")
+    if not (enabled or profile_file):
+        yield profiler
+        return
+    with profiler.session(enabled, profile_file):
+        yield profiler
+    result["profile"] = profiler.report()
+    if profile_file:
+        result["profile"]["profile_file"] = profile_file
+
+
 @dataclass
 class UtilsBase:
     name: str
 
     def is_trusted(self, target_dir: Path) -> bool:
-        try:
-            get_module_from_config(self.name, target_dir)
+        if self.name in ModuleConfig.load(target_dir):
             return True
-        except KeyError:
-            print(f"- do not build: {self.name}")
-            return False
+        print(f"- do not build: {self.name}")
+        return False
+
+    def module_path(self, target_dir: Path) -> Path:
+        return Path(target_dir + "/plugins/modules") / "{name}.py".format(name=self.name)
+
+    def build_inputs(self, target_dir: Path, module_dir: Path) -> Any:
+        """Return the data the module is rendered from, see BuildManifest.
+
+        None means the inputs are unknown and the module is always rendered.
+        """
+        return None
 
-    def write_module(self, target_dir: Path, content: str) -> None:
-        module_dir = Path(target_dir + "/plugins/modules")
-        module_dir.mkdir(parents=True, exist_ok=True)
-        module_py_file = module_dir / "{name}.py".format(name=self.name)
-        module_py_file.write_text(content)
+    def write_module(self, target_dir: Path, content: str) -> bool:
+        """Format and write the module file, return False if it was already up to date."""
+        with profiler.stage("format"):
+            content = format_python(content, target_dir)
+        with profiler.stage("write"):
+            return write_if_changed(self.module_path(target_dir), content)
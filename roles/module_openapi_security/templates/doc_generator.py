@@ -2,9 +2,13 @@ from __future__ import absolute_import, division, print_function
 
 __metaclass__ = type
 
+import argparse
 import json
+import multiprocessing
+import os
 import re
 import sys
+import traceback
 import oyaml as yaml
 from collections import OrderedDict, deque
 
@@ -824,6 +828,166 @@ def ckp_params_fields_parsing(object_data, api_params, global_var_mgmt_dict):
     return api_params_dict
 
 
+def load_api_spec(rm_swagger_json):
+    with open(rm_swagger_json, encoding="cp1252") as file:
+        return json.loads(file.read(), object_pairs_hook=OrderedDict)
+
+
+def generate_module(
+    data,
+    api_object_path,
+    module_name,
+    module_version,
+    resource,
+    collection_org,
+    author,
+    output_dir,
+):
+    """Write the params.json and data.yml of a module in output_dir.
+
+    The parsing of the API object updates data in place, data must not be
+    used to generate another module afterwards.
+    """
+    request_fields = None
+    if collection_org == "checkpoint":
+        if data.get("commands") and data.get("objects"):
+            for each in data["commands"]:
+                if each["name"].get("web") == api_object_path:
+                    request = each["request"]
+                    break
+            for each in data["objects"]:
+                if each["name"] == request:
+                    if (
+                        each.get("fields")
+                        and each.get("under-more-fields")
+                        and each.get("required-fields")
+                    ):
+                        request_fields = (
+                            each["required-fields"]
+                            + each["fields"]
+                            + each["under-more-fields"]
+                        )
+                    elif each.get("fields"):
+                        request_fields = each["fields"]
+                    break
+    elif collection_org in ["trendmicro", "fortinet"]:
+        # TrendMicro
+        # api_object = data["paths"]["/intrusionpreventionrules"]["post"]
+        # Fortinet
+        # api_object = data["paths"]["/firewall/policy"]["post"]
+        api_object = data["paths"][api_object_path]["post"]
+    global_var_mgmt_dict = {}
+    if request_fields:
+        post_properties = OrderedDict()
+        post_properties.update(
+            {
+                "properties": ckp_params_fields_parsing(
+                    data["objects"], request_fields, global_var_mgmt_dict
+                )
+            }
+        )
+    else:
+        if collection_org == "trendmicro":
+            post_properties = get_api_param_properties_recursively(
+                "$ref", api_object, data, global_var_mgmt_dict
+            )
+        elif collection_org == "fortinet":
+            post_properties = get_api_param_properties_recursively(
+                "schema", api_object, data, global_var_mgmt_dict
+            )
+
+    temp_param_file = output_dir + "/params.json"
+    temp_data_file = output_dir + "/data.yml"
+    with open(temp_param_file, "w+") as ff:
+        ff.write("""{0}""".format(json.dumps(global_var_mgmt_dict)))
+
+    generate_documentation(
+        post_properties,
+        module_name,
+        module_version,
+        resource,
+        author,
+        temp_data_file,
+    )
+
+
+# The API specs of a batch, parsed before the workers are forked
+BATCH_SPECS = {}
+
+
+def _generate_batch_module(module):
+    try:
+        if not os.path.isdir(module["output_dir"]):
+            os.makedirs(module["output_dir"])
+        generate_module(
+            BATCH_SPECS[module["rm_swagger_json"]],
+            module["api_object_path"],
+            module["name"],
+            module["module_version"],
+            module["resource"],
+            module["collection_org"],
+            module["author"],
+            module["output_dir"],
+        )
+    except Exception:
+        return traceback.format_exc()
+    return None
+
+
+def generate_batch(modules, workers):
+    """Generate the params.json and data.yml of several modules.
+
+    Each API spec is parsed once, and the modules are generated by a pool
+    of forked workers. A worker generates a single module
+    (maxtasksperchild=1): the generation updates the spec in place, each
+    module starts from the spec as it was parsed.
+
+    Return the errors, by module name.
+    """
+    BATCH_SPECS.clear()
+    for module in modules:
+        if module["rm_swagger_json"] not in BATCH_SPECS:
+            BATCH_SPECS[module["rm_swagger_json"]] = load_api_spec(
+                module["rm_swagger_json"]
+            )
+    context = multiprocessing.get_context("fork")
+    with context.Pool(workers, maxtasksperchild=1) as pool:
+        errors = pool.map(_generate_batch_module, modules, chunksize=1)
+    BATCH_SPECS.clear()
+    return {
+        module["name"]: error
+        for module, error in zip(modules, errors)
+        if error is not None
+    }
+
+
+def batch_main(argv):
+    parser = argparse.ArgumentParser(
+        prog="doc_generator.py",
+        description="Generate the params.json and data.yml of several modules.",
+    )
+    parser.add_argument(
+        "--batch",
+        required=True,
+        help="JSON file with the list of the modules to generate, each one with"
+        " the rm_swagger_json, api_object_path, name, module_version, resource,"
+        " collection_org, author and output_dir keys",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=multiprocessing.cpu_count(),
+        help="number of worker processes (default: the number of CPUs)",
+    )
+    args = parser.parse_args(argv)
+    with open(args.batch) as file:
+        modules = json.load(file)
+    errors = generate_batch(modules, max(args.workers, 1))
+    for name, error in errors.items():
+        sys.stderr.write("{0}: {1}\n".format(name, error))
+    return 1 if errors else 0
+
+
 def main():
     ####################################################
     #     str(sys.argv[0]) -> doc_generator.py
@@ -837,77 +1001,24 @@ def main():
     #     str(sys.argv[8]) -> unique_key
     #     str(sys.argv[9]) -> author
     #     str(sys.argv[10])-> Temp Dir path
+    #
+    # or, to generate several modules at once:
+    #     doc_generator.py --batch <modules.json> [--workers N]
     ####################################################
 
-    with open(str(sys.argv[1]), encoding="cp1252") as file:
-        json_content = file.read()
-        data = json.loads(json_content, object_pairs_hook=OrderedDict)
-        request_fields = None
-        if str(sys.argv[6]) == "checkpoint":
-            if data.get("commands") and data.get("objects"):
-                for each in data["commands"]:
-                    if each["name"].get("web") == str(sys.argv[2]):
-                        request = each["request"]
-                        break
-                for each in data["objects"]:
-                    if each["name"] == request:
-                        if (
-                            each.get("fields")
-                            and each.get("under-more-fields")
-                            and each.get("required-fields")
-                        ):
-                            request_fields = (
-                                each["required-fields"]
-                                + each["fields"]
-                                + each["under-more-fields"]
-                            )
-                        elif each.get("fields"):
-                            request_fields = each["fields"]
-                        break
-        elif str(sys.argv[6]) in ["trendmicro", "fortinet"]:
-            # TrendMicro
-            # api_object = data["paths"]["/intrusionpreventionrules"]["post"]
-            # Fortinet
-            # api_object = data["paths"]["/firewall/policy"]["post"]
-            api_object = data["paths"][str(sys.argv[2])]["post"]
-        global_var_mgmt_dict = {}
-        if request_fields:
-            post_properties = OrderedDict()
-            post_properties.update(
-                {
-                    "properties": ckp_params_fields_parsing(
-                        data["objects"], request_fields, global_var_mgmt_dict
-                    )
-                }
-            )
-        else:
-            if str(sys.argv[6]) == "trendmicro":
-                post_properties = get_api_param_properties_recursively(
-                    "$ref", api_object, data, global_var_mgmt_dict
-                )
-            elif str(sys.argv[6]) == "fortinet":
-                post_properties = get_api_param_properties_recursively(
-                    "schema", api_object, data, global_var_mgmt_dict
-                )
+    if sys.argv[1].startswith("--"):
+        sys.exit(batch_main(sys.argv[1:]))
 
-        module_name = str(sys.argv[3])
-        module_resource = str(sys.argv[5])
-        module_version = str(sys.argv[4])
-        author = str(sys.argv[9])
-
-        temp_param_file = str(sys.argv[10]) + "/params.json"
-        temp_data_file = str(sys.argv[10]) + "/data.yml"
-        with open(temp_param_file, "w+") as ff:
-            ff.write("""{0}""".format(json.dumps(global_var_mgmt_dict)))
-
-        generate_documentation(
-            post_properties,
-            module_name,
-            module_version,
-            module_resource,
-            author,
-            temp_data_file,
-        )
+    generate_module(
+        load_api_spec(str(sys.argv[1])),
+        str(sys.argv[2]),
+        str(sys.argv[3]),
+        str(sys.argv[4]),
+        str(sys.argv[5]),
+        str(sys.argv[6]),
+        str(sys.argv[9]),
+        str(sys.argv[10]),
+    )
 
 
 if __name__ == "__main__":
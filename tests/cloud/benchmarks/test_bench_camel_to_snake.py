@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+
+# Convert the keys of amazon_cloud schemas to snake case, with and without the
+# cache. The schemas of tests/cloud/fixtures are used, point
+# AMAZON_CLOUD_SCHEMA_DIR to the schema_dir of amazon.cloud for the real ones:
+#   pytest tests/cloud/benchmarks --benchmark-group-by=group
+
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from ansible_collections.ansible.content_builder.plugins.plugin_utils.cloud_utils import utils
+
+pytest.importorskip("pytest_benchmark")
+
+
+def schema_keys(schema):
+    """Return the keys of a schema, in the order a module generation sees them."""
+    keys = []
+    stack = [schema]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            keys.extend(node)
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return keys
+
+
+@pytest.fixture(scope="module")
+def keys():
+    schema_dir = Path(os.environ.get("AMAZON_CLOUD_SCHEMA_DIR", "tests/cloud/fixtures"))
+    keys = []
+    for path in sorted(schema_dir.glob("*.json")):
+        keys.extend(schema_keys(json.loads(path.read_text())))
+    return keys
+
+
+def convert_without_cache(keys):
+    return [utils._camel_to_snake.__wrapped__(key) for key in keys]
+
+
+def convert(keys):
+    return [utils._camel_to_snake(key) for key in keys]
+
+
+@pytest.mark.benchmark(group="camel_to_snake")
+def test_bench_camel_to_snake_without_cache(benchmark, keys):
+    assert benchmark(convert_without_cache, keys) == convert(keys)
+
+
+@pytest.mark.benchmark(group="camel_to_snake")
+def test_bench_camel_to_snake(benchmark, keys):
+    utils._camel_to_snake.cache_clear()
+    convert(keys)
+    info = utils._camel_to_snake.cache_info()
+    benchmark.extra_info["keys"] = len(keys)
+    benchmark.extra_info["hit_rate"] = info.hits / (info.hits + info.misses)
+    benchmark(convert, keys)
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+
+# Generation time of synthetic amazon_cloud and vmware_rest modules of
+# growing sizes, compared with the baselines stored in the repository.
+# The default tox environment skips them, run them with:
+#   tox -e benchmark
+# A change that makes the generation faster or slower on purpose saves a
+# new baseline with its commit:
+#   tox -e benchmark -- --benchmark-save=baseline
+# The sizes are the number of properties (CloudFormation) or paths
+# (Swagger), set CLOUD_BENCHMARK_SIZES=100,1000,10000 to add the largest
+# ones, they take about ten minutes.
+
+import copy
+import json
+import os
+import random
+
+import pytest
+import yaml
+
+from ansible_collections.ansible.content_builder.plugins.action import generate_cloud_modules as rm
+from ansible_collections.ansible.content_builder.plugins.action import generate_cloud_schema as rs
+from ansible_collections.ansible.content_builder.plugins.plugin_utils.cloud_utils import generator
+from ansible_collections.ansible.content_builder.plugins.plugin_utils.cloud_utils import utils
+
+pytest.importorskip("pytest_benchmark")
+
+SIZES = [int(s) for s in os.environ.get("CLOUD_BENCHMARK_SIZES", "100,1000").split(",")]
+ROLE_PATH = "roles/module_openapi_cloud"
+WORDS = ["Bucket", "Policy", "Target", "Group", "Rule", "Key", "Version", "Endpoint", "Domain", "Tag"]
+
+
+def cloudformation_schema(properties, seed=0):
+    """Return the schema of a resource with the given number of properties.
+
+    One property in ten is an object described in the definitions, with
+    nested objects, lists and enums of its own.
+    """
+    rnd = random.Random(seed)
+    schema = {
+        "typeName": "AWS::Synthetic::Resource",
+        "description": "A synthetic resource.",
+        "properties": {},
+        "definitions": {},
+        "required": [],
+        "readOnlyProperties": [],
+        "primaryIdentifier": ["/properties/ResourceName"],
+        "createOnlyProperties": ["/properties/ResourceName"],
+        "handlers": {"create": {}, "read": {}, "update": {}, "delete": {}, "list": {}},
+    }
+    for i in range(properties):
+        name = "ResourceName" if i == 0 else f"{WORDS[i % len(WORDS)]}{rnd.choice(WORDS)}{i}"
+        description = (
+            f"The {name} of the resource. Set it to STANDARD_IA or GLACIER, see "
+            f"https://docs.aws.amazon.com/{name}."
+        )
+        kind = i % 10
+        if kind == 0:
+            definition = f"{name}Configuration"
+            schema["definitions"][definition] = {
+                "type": "object",
+                "description": description,
+                "additionalProperties": False,
+                "properties": {
+                    "Enabled": {"type": "boolean", "description": "If the configuration is enabled."},
+                    "Mode": {"type": "string", "enum": ["STANDARD_IA", "GLACIER"]},
+                    "Rules": {
+                        "type": "array",
+                        "uniqueItems": True,
+                        "items": {
+                            "type": "object",
+                            "properties": {"Id": {"type": "string"}, "Priority": {"type": "integer"}},
+                            "required": ["Id"],
+                        },
+                    },
+                },
+                "required": ["Mode"],
+            }
+            schema["properties"][name] = {"$ref": f"#/definitions/{definition}"}
+        elif kind in (1, 2):
+            schema["properties"][name] = {"type": "array", "items": {"type": "string"}, "description": description}
+        elif kind == 3:
+            schema["properties"][name] = {"type": "integer", "minimum": 0, "description": description}
+        elif kind == 4:
+            schema["properties"][name] = {"type": "boolean", "description": description}
+        else:
+            schema["properties"][name] = {"type": "string", "maxLength": 255, "description": description}
+        if kind == 5:
+            schema["required"].append(name)
+        elif kind == 6:
+            schema["readOnlyProperties"].append(f"/properties/{name}")
+    return schema
+
+
+def swagger_spec(paths, properties=20):
+    """Return a vmware_rest like spec with the given number of paths.
+
+    Each resource has a collection and an item path, the create_spec of
+    the resources have the given number of properties.
+    """
+    spec = {"paths": {}, "definitions": {}}
+    for r in range(paths // 2):
+        name = f"{WORDS[r % len(WORDS)].lower()}{r}"
+        spec["definitions"][f"vcenter.{name}.create_spec"] = {
+            "type": "object",
+            "required": ["field_0"],
+            "properties": {
+                f"field_{p}": (
+                    {"type": "string", "enum": ["ONE", "TWO"], "description": f"Field {p} of the {{@link vcenter.VM}}."}
+                    if p % 3 == 0
+                    else {"type": "array", "items": {"type": "string"}, "description": f"The {{@name Field{p}}} list."}
+                    if p % 3 == 1
+                    else {"type": "integer", "description": f"The {{@code field_{p}}} value."}
+                )
+                for p in range(properties)
+            },
+        }
+        spec["definitions"][f"vcenter.{name}.summary"] = {"type": "object", "properties": {"id": {"type": "string"}}}
+        item_parameter = {"name": name, "in": "path", "type": "string", "required": True, "description": "Identifier."}
+        spec["paths"][f"/api/vcenter/{name}"] = {
+            "get": {
+                "operationId": "list",
+                "summary": f"Returns the {name}s.",
+                "parameters": [{"name": "names", "in": "query", "type": "array", "items": {"type": "string"}}],
+                "responses": {"200": {"schema": {"$ref": f"#/definitions/vcenter.{name}.summary"}}},
+            },
+            "post": {
+                "operationId": "create",
+                "summary": f"Creates a {name}.",
+                "parameters": [
+                    {"in": "body", "name": "request_body", "schema": {"$ref": f"#/definitions/vcenter.{name}.create_spec"}}
+                ],
+                "responses": {"201": {"schema": {"type": "string"}}},
+            },
+        }
+        spec["paths"][f"/api/vcenter/{name}/{{{name}}}"] = {
+            "get": {
+                "operationId": "get",
+                "summary": f"Returns a {name}.",
+                "parameters": [item_parameter],
+                "responses": {"200": {"schema": {"$ref": f"#/definitions/vcenter.{name}.summary"}}},
+            },
+            "delete": {
+                "operationId": "delete",
+                "summary": f"Deletes a {name}.",
+                "parameters": [item_parameter],
+                "responses": {"204": {}},
+            },
+        }
+    return spec
+
+
+@pytest.fixture
+def module_dir(tmp_path):
+    modules = tmp_path / "modules.yaml"
+    modules.write_text(
+        yaml.safe_dump(
+            [
+                {
+                    "synthetic_resource": {
+                        "documentation": {
+                            "short_description": "Create and manage synthetic resources",
+                            "description": ["Create and manage synthetic resources."],
+                        }
+                    }
+                },
+                {"vcenter_bucket0": {}},
+            ]
+        )
+    )
+    return str(tmp_path)
+
+
+def amazon_module(size):
+    return rm.AnsibleModuleBaseAmazon(schema=rs.generate_schema(json.dumps(cloudformation_schema(size))))
+
+
+def vmware_module(size):
+    swagger_file = rm.SwaggerFile(swagger_spec(2, properties=size))
+    return rm.AnsibleModuleBaseVmware(swagger_file.resources["vcenter_bucket0"], swagger_file.definitions)
+
+
+def documentation(module, module_dir):
+    return generator.generate_documentation(copy.deepcopy(module), {"module": None}, "1.0.0", module_dir)
+
+
+@pytest.mark.benchmark(group="SwaggerFile")
+@pytest.mark.parametrize("size", SIZES)
+def test_bench_SwaggerFile(benchmark, size):
+    spec = swagger_spec(size)
+    swagger_file = benchmark(rm.SwaggerFile, spec)
+    assert len(swagger_file.paths) == size // 2 * 2
+
+
+@pytest.mark.benchmark(group="parameters")
+@pytest.mark.parametrize("size", SIZES)
+def test_bench_parameters(benchmark, size):
+    module = vmware_module(size)
+
+    def setup():
+        module.invalidate_parameters()
+
+    parameters = benchmark.pedantic(module.parameters, setup=setup, rounds=5)
+    assert len(parameters) > size
+
+
+@pytest.mark.benchmark(group="generate_documentation")
+@pytest.mark.parametrize("size", SIZES)
+def test_bench_generate_documentation(benchmark, module_dir, size):
+    module = amazon_module(size)
+
+    def setup():
+        return (copy.deepcopy(module), {"module": None}, "1.0.0", module_dir), {}
+
+    result = benchmark.pedantic(generator.generate_documentation, setup=setup, rounds=5)
+    assert len(result["options"]) > size // 2
+
+
+@pytest.mark.benchmark(group="format_documentation")
+@pytest.mark.parametrize("size", SIZES)
+def test_bench_format_documentation(benchmark, module_dir, size):
+    docs = documentation(amazon_module(size), module_dir)
+    content = benchmark(utils.format_documentation, docs)
+    assert content.startswith("r'''\nmodule: synthetic_resource\n")
+
+
+@pytest.mark.benchmark(group="renderer")
+@pytest.mark.parametrize("collection", ["amazon_cloud", "vmware_rest"])
+@pytest.mark.parametrize("size", SIZES)
+def test_bench_renderer(benchmark, tmp_path, module_dir, collection, size):
+    module = amazon_module(size) if collection == "amazon_cloud" else vmware_module(size)
+    target_dir = tmp_path / "collection"
+    (target_dir / "plugins" / "modules").mkdir(parents=True)
+
+    def setup():
+        module.module_path(str(target_dir)).unlink(missing_ok=True)
+        if collection == "vmware_rest":
+            module.invalidate_parameters()
+        return (copy.deepcopy(module) if collection == "amazon_cloud" else module,), {}
+
+    def render(module):
+        return module.renderer(
+            target_dir=str(target_dir), module_dir=module_dir, next_version="1.0.0", role_path=ROLE_PATH
+        )
+
+    assert benchmark.pedantic(render, setup=setup, rounds=3)
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+
+# Render time of a vmware_rest module, with and without the cached Environment:
+#   pytest tests/cloud/benchmarks --benchmark-group-by=group
+
+import jinja2
+import pytest
+
+from ansible_collections.ansible.content_builder.plugins.plugin_utils.cloud_utils import utils
+
+pytest.importorskip("pytest_benchmark")
+
+ROLE_PATH = "roles/module_openapi_cloud"
+
+
+def render_without_cache(template_file, role_path, collection, **kwargs):
+    loader = jinja2.FileSystemLoader(role_path + "/templates/module_directory/" + collection)
+    return jinja2.Environment(loader=loader).get_template(template_file).render(kwargs)
+
+
+@pytest.fixture(scope="module")
+def render_args():
+    return {
+        "arguments": "    argument_spec['vm'] = {'type': 'str'}\n",
+        "documentation": "r'''\nmodule: vcenter_vm\n'''",
+        "list_index": "vm",
+        "list_path": "/api/vcenter/vm",
+        "name": "vcenter_vm",
+        "operations": {
+            "create": ("post", "/api/vcenter/vm", [], {}),
+            "delete": ("delete", "/api/vcenter/vm/{vm}", [], {}),
+            "get": ("get", "/api/vcenter/vm/{vm}", [], {}),
+            "list": ("get", "/api/vcenter/vm", [], {}),
+        },
+        "path": "/api/vcenter/vm",
+        "payload_format": {"create": {"query": {}, "body": {}, "path": {}}},
+        "required_if": [],
+    }
+
+
+@pytest.mark.benchmark(group="jinja2_renderer")
+def test_bench_jinja2_renderer_without_cache(benchmark, render_args, tmp_path):
+    content = benchmark(
+        render_without_cache, "default_module.j2", ROLE_PATH, "vmware_rest", **render_args
+    )
+    assert content == utils.jinja2_renderer(
+        "default_module.j2", ROLE_PATH, "vmware_rest", tmp_path, **render_args
+    )
+
+
+@pytest.mark.benchmark(group="jinja2_renderer")
+def test_bench_jinja2_renderer(benchmark, render_args, tmp_path):
+    content = benchmark(
+        utils.jinja2_renderer, "default_module.j2", ROLE_PATH, "vmware_rest", tmp_path, **render_args
+    )
+    assert "def build_url(params):" in content
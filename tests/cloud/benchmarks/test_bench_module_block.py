@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+
+# Compare the DOCUMENTATION extraction with the ast module and with RedBaron:
+#   pytest tests/cloud/benchmarks --benchmark-group-by=group
+
+import pytest
+
+from ansible_collections.ansible.content_builder.plugins.plugin_utils.cloud_utils import module_blocks, utils
+
+pytest.importorskip("pytest_benchmark")
+
+
+def module_content(options=50, functions=30):
+    documentation = utils.format_documentation(
+        {
+            "module": "foo",
+            "short_description": "A synthetic module",
+            "options": {
+                f"option_{i}": {"description": [f"Option {i}."], "type": "str"}
+                for i in range(options)
+            },
+        }
+    )
+    body = "\n\n".join(
+        f"def function_{i}(module, params):\n"
+        f"    result = {{'changed': False, 'index': {i}}}\n"
+        f"    for key, value in params.items():\n"
+        f"        if value is not None:\n"
+        f"            result[key] = value\n"
+        f"    return result\n"
+        for i in range(functions)
+    )
+    return f'DOCUMENTATION = r"""\n{documentation}"""\n\nEXAMPLES = r"""\n"""\n\n{body}'
+
+
+@pytest.fixture(scope="module")
+def content():
+    return module_content()
+
+
+@pytest.mark.benchmark(group="module_block")
+def test_bench_get_module_block_ast(benchmark, content):
+    documentation = benchmark(module_blocks.get_module_block, content, "DOCUMENTATION")
+    assert documentation == module_blocks._get_module_block_with_redbaron(content, "DOCUMENTATION")
+
+
+@pytest.mark.benchmark(group="module_block")
+def test_bench_get_module_block_redbaron(benchmark, content):
+    documentation = benchmark.pedantic(
+        module_blocks._get_module_block_with_redbaron, args=(content, "DOCUMENTATION"), rounds=5
+    )
+    assert documentation == module_blocks.get_module_block(content, "DOCUMENTATION")
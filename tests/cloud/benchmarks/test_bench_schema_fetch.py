@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+
+# Refresh the schemas of hundreds of types from a local CloudFormation
+# endpoint that adds some latency to every call, like the real one:
+#   pytest tests/cloud/benchmarks --benchmark-group-by=group
+
+import json
+
+import pytest
+
+from ansible_collections.ansible.content_builder.plugins.action import generate_cloud_schema as rs
+from ansible_collections.ansible.content_builder.plugins.plugin_utils.cloud_utils import generator
+
+pytest.importorskip("pytest_benchmark")
+
+TYPES = 300
+
+
+@pytest.fixture
+def type_names(tmp_path, cloudformation_stand_in):
+    source_dir = tmp_path / "source"
+    source_dir.mkdir()
+    type_names = [f"AWS::Service{i // 10}::Resource{i}" for i in range(TYPES)]
+    for name in type_names:
+        (source_dir / (name.replace("::", "_") + ".json")).write_text(
+            json.dumps(
+                {
+                    "typeName": name,
+                    "properties": {f"Property{p}": {"type": "string"} for p in range(20)},
+                    "primaryIdentifier": ["/properties/Property0"],
+                    "readOnlyProperties": ["/properties/Property1"],
+                }
+            )
+        )
+    cloudformation_stand_in.source = generator.DirectorySchemaSource(source_dir)
+    cloudformation_stand_in.latency = 0.01
+    return type_names
+
+
+@pytest.mark.benchmark(group="schema_fetch")
+@pytest.mark.parametrize("workers", [1, 16])
+def test_bench_collect_schemas(benchmark, tmp_path, cloudformation_stand_in, type_names, workers):
+    cloudformation = rs.schema_source(cloudformation_stand_in.endpoint_url, workers=workers)
+    schema_dir = tmp_path / "schemas"
+    schema_dir.mkdir()
+
+    result = benchmark.pedantic(
+        rs.collect_schemas,
+        args=(cloudformation, type_names, str(schema_dir)),
+        kwargs={"workers": workers, "force": True},
+        rounds=1,
+    )
+    assert result["collected"] == type_names
+
+    # nothing changed upstream, only list-types is called
+    cloudformation_stand_in.calls = []
+    assert rs.collect_schemas(cloudformation, type_names, str(schema_dir))["collected"] == []
+    assert cloudformation_stand_in.calls == []
@@ -0,0 +1,140 @@
+# (c) 2023 Red Hat Inc.
+#
+# This file is part of Ansible
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+
+__metaclass__ = type
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+from xml.sax.saxutils import escape
+
+import pytest
+
+import ansible_collections.ansible.content_builder.plugins.plugin_utils.cloud_utils.generator as g
+
+
+class MemorySchemaSource(g.SchemaSource):
+    """A schema source backed by two dicts."""
+
+    def __init__(self, schemas=None, versions=None):
+        self.schemas = schemas or {}
+        self.versions = versions or {}
+
+    def generate_docs(self, type_name):
+        return self.schemas[type_name]
+
+    def list_type_versions(self):
+        return dict(self.versions)
+
+
+class CloudFormationHandler(BaseHTTPRequestHandler):
+    """Answer the ListTypes and DescribeType calls of a CloudFormation client."""
+
+    def do_POST(self):
+        stand_in = self.server.stand_in
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        params = {k: v[0] for k, v in parse_qs(body.decode()).items()}
+        if stand_in.latency:
+            time.sleep(stand_in.latency)
+        if params["Action"] == "ListTypes":
+            return self.list_types(params)
+        type_name = params["TypeName"]
+        with stand_in.lock:
+            stand_in.calls.append(type_name)
+            throttled = type_name in stand_in.throttled
+            stand_in.throttled.discard(type_name)
+        if throttled:
+            return self.error(400, "Throttling", "Rate exceeded")
+        try:
+            schema = stand_in.source.generate_docs(type_name)
+        except (KeyError, OSError):
+            return self.error(404, "TypeNotFoundException", "Not found")
+        self.reply(
+            "DescribeType",
+            f"<Schema>{escape(schema)}</Schema><TypeName>{type_name}</TypeName>",
+        )
+
+    def list_types(self, params):
+        stand_in = self.server.stand_in
+        versions = stand_in.source.list_type_versions()
+        names = sorted(versions)
+        start = int(params.get("NextToken", 0))
+        end = start + stand_in.page_size
+        members = "".join(
+            f"<member><Type>RESOURCE</Type><TypeName>{name}</TypeName>"
+            f"<DefaultVersionId>{versions[name]}</DefaultVersionId>"
+            "<LastUpdated>2023-01-01T00:00:00Z</LastUpdated></member>"
+            for name in names[start:end]
+        )
+        next_token = f"<NextToken>{end}</NextToken>" if end < len(names) else ""
+        self.reply("ListTypes", f"<TypeSummaries>{members}</TypeSummaries>{next_token}")
+
+    def reply(self, action, result):
+        self.send(
+            200,
+            f'<{action}Response xmlns="http://cloudformation.amazonaws.com/doc/2010-05-15/">'
+            f"<{action}Result>{result}</{action}Result>"
+            f"<ResponseMetadata><RequestId>1</RequestId></ResponseMetadata></{action}Response>",
+        )
+
+    def error(self, status, code, message):
+        self.send(
+            status,
+            f"<ErrorResponse><Error><Type>Sender</Type><Code>{code}</Code>"
+            f"<Message>{message}</Message></Error><RequestId>1</RequestId></ErrorResponse>",
+        )
+
+    def send(self, status, content):
+        content = content.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "text/xml")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+class CloudFormationStandIn:
+    """A local CloudFormation endpoint that serves the schemas of a SchemaSource.
+
+    The types listed in `throttled` are throttled once, `latency` is added to
+    every call and `calls` records the type names passed to DescribeType.
+    """
+
+    def __init__(self, source=None, latency=0, page_size=100):
+        self.source = source or MemorySchemaSource()
+        self.latency = latency
+        self.page_size = page_size
+        self.throttled = set()
+        self.calls = []
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), CloudFormationHandler)
+        self.server.daemon_threads = True
+        self.server.stand_in = self
+        self.endpoint_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def cloudformation_stand_in(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "fake")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "fake")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    stand_in = CloudFormationStandIn()
+    stand_in.start()
+    yield stand_in
+    stand_in.stop()
@@ -12,6 +12,8 @@ import os
 import json
 from pathlib import Path
 
+import pytest
+
 import ansible_collections.ansible.content_builder.plugins.plugin_utils.cloud_utils.generator as g
 import ansible_collections.ansible.content_builder.plugins.action.generate_cloud_modules as rm
 import ansible_collections.ansible.content_builder.plugins.action.generate_cloud_schema as rs
@@ -71,6 +73,279 @@ def test_generate_documentation():
     assert documentation == expected_content
 
 
+def test_Documentation_preprocess():
+    docs = g.Documentation()
+    docs.options = {
+        "Rules": {"$ref": "#/definitions/Rules"},
+        "Config": {
+            "type": "object",
+            "properties": {
+                "Rules": {"$ref": "#/definitions/Rules"},
+                "Id": {"type": "string", "pattern": "^x$"},
+            },
+        },
+    }
+    docs.definitions = {
+        "Rules": {
+            "type": "object",
+            "description": "The rules.",
+            "properties": {
+                "Values": {
+                    "type": "array",
+                    "required": ["Foo"],
+                    "items": {"type": "array", "items": {"type": "string", "maxLength": 4}},
+                }
+            },
+        }
+    }
+    docs.required = []
+    docs.read_only_properties = []
+    docs.primary_identifier = []
+
+    rules = {
+        "type": "dict",
+        "description": ["The rules."],
+        "suboptions": {
+            "values": {"type": "list", "elements": "str", "description": ["Not Provived."]}
+        },
+    }
+    assert docs.preprocess() == {
+        "rules": rules,
+        "config": {
+            "type": "dict",
+            "suboptions": {
+                "rules": rules,
+                "id": {"type": "str", "description": ["Not Provived."]},
+            },
+            "description": ["Not Provived."],
+        },
+    }
+
+
+def test_Documentation_preprocess_shared_definition():
+    # From AWS::ACMPCA::Certificate, CustomObjectIdentifier has several references
+    docs = g.Documentation()
+    docs.options = {
+        "CertificatePolicies": {
+            "type": "array",
+            "items": {"$ref": "#/definitions/PolicyInformation"},
+        },
+        "OtherName": {"$ref": "#/definitions/OtherName"},
+    }
+    docs.definitions = {
+        "CustomObjectIdentifier": {
+            "description": "String that contains X.509 ObjectIdentifier information.",
+            "type": "string",
+        },
+        "OtherName": {
+            "additionalProperties": False,
+            "description": "Defines a custom ASN.1 X.400 ``GeneralName`` using an object identifier (OID) and value.",
+            "properties": {
+                "TypeId": {
+                    "$ref": "#/definitions/CustomObjectIdentifier",
+                    "description": "Specifies an OID.",
+                },
+                "Value": {"description": "Specifies an OID value.", "type": "string"},
+            },
+            "required": ["TypeId", "Value"],
+            "type": "object",
+        },
+        "PolicyInformation": {
+            "additionalProperties": False,
+            "description": "Defines the X.509 ``CertificatePolicies`` extension.",
+            "properties": {
+                "CertPolicyId": {
+                    "$ref": "#/definitions/CustomObjectIdentifier",
+                    "description": "Specifies the object identifier (OID) of the certificate policy under which the certificate was issued.",
+                },
+            },
+            "required": ["CertPolicyId"],
+            "type": "object",
+        },
+    }
+    docs.required = []
+    docs.read_only_properties = []
+    docs.primary_identifier = []
+
+    assert docs.preprocess() == {
+        "certificate_policies": {
+            "type": "list",
+            "elements": "dict",
+            "description": ["Defines the X.509 CertificatePolicies extension."],
+            "suboptions": {
+                "cert_policy_id": {
+                    "description": [
+                        "Specifies the object identifier (OID) of the certificate policy under which the certificate was issued.",
+                        "String that contains X.509 ObjectIdentifier information.",
+                    ],
+                    "type": "str",
+                },
+            },
+        },
+        "other_name": {
+            "type": "dict",
+            "description": [
+                "Defines a custom ASN.1 X.400 GeneralName using an object identifier (OID) and value."
+            ],
+            "suboptions": {
+                "type_id": {
+                    "description": [
+                        "Specifies an OID.",
+                        "String that contains X.509 ObjectIdentifier information.",
+                    ],
+                    "type": "str",
+                },
+                "value": {"description": ["Specifies an OID value."], "type": "str"},
+            },
+        },
+    }
+    assert docs.definitions["CustomObjectIdentifier"] == {
+        "description": "String that contains X.509 ObjectIdentifier information.",
+        "type": "string",
+    }
+
+
+def test_Documentation_preprocess_array_of_arrays():
+    # From AWS::QuickSight::DataSet
+    docs = g.Documentation()
+    docs.options = {
+        "RowLevelPermissionTagConfiguration": {
+            "$ref": "#/definitions/RowLevelPermissionTagConfiguration"
+        },
+    }
+    docs.definitions = {
+        "RowLevelPermissionTagConfiguration": {
+            "additionalProperties": False,
+            "description": "The configuration of tags on a dataset to set row-level security.",
+            "properties": {
+                "TagRuleConfigurations": {
+                    "description": "A list of tag configuration rules to apply to a dataset.",
+                    "items": {
+                        "items": {"maxLength": 128, "minLength": 1, "type": "string"},
+                        "maxItems": 50,
+                        "minItems": 1,
+                        "type": "array",
+                    },
+                    "maxItems": 50,
+                    "minItems": 1,
+                    "type": "array",
+                },
+            },
+            "type": "object",
+        },
+    }
+    docs.required = []
+    docs.read_only_properties = []
+    docs.primary_identifier = []
+
+    options = docs.preprocess()
+    assert options == {
+        "row_level_permission_tag_configuration": {
+            "description": [
+                "The configuration of tags on a dataset to set row-level security."
+            ],
+            "suboptions": {
+                "tag_rule_configurations": {
+                    "description": [
+                        "A list of tag configuration rules to apply to a dataset."
+                    ],
+                    "elements": "str",
+                    "type": "list",
+                },
+            },
+            "type": "dict",
+        },
+    }
+    assert rm.generate_argument_spec(options) == (
+        "\nargument_spec['row_level_permission_tag_configuration'] = "
+        "{'type': 'dict', 'options': "
+        "{'tag_rule_configurations': {'type': 'list', 'elements': 'str'}}}"
+    )
+
+
 def test_generate_runtime_yml():
     runtime_yml = g.generate_runtime_yml("1.2.3", "test", ["foo", "bar"])
     assert runtime_yml == {"requires_ansible": ">=1.2.3", "action_groups": {"test": ["foo", "bar"]}}
+
+
+def test_CloudFormationWrapper_fetch_schemas(cloudformation_stand_in):
+    type_names = [f"AWS::Test::Resource{i}" for i in range(20)]
+    cloudformation_stand_in.source.schemas = {
+        name: json.dumps({"typeName": name}) for name in type_names
+    }
+    cloudformation_stand_in.throttled = {"AWS::Test::Resource3"}
+
+    cloudformation = rs.schema_source(cloudformation_stand_in.endpoint_url, workers=4)
+    assert isinstance(cloudformation, g.CloudFormationWrapper)
+    schemas, errors = cloudformation.fetch_schemas(type_names + ["AWS::Test::Missing"], workers=4)
+
+    assert list(schemas) == type_names
+    assert json.loads(schemas["AWS::Test::Resource3"]) == {"typeName": "AWS::Test::Resource3"}
+    assert list(errors) == ["AWS::Test::Missing"]
+    assert "TypeNotFoundException" in errors["AWS::Test::Missing"]
+    # the throttled call has been retried
+    assert cloudformation_stand_in.calls.count("AWS::Test::Resource3") == 2
+
+
+def test_collect_schemas(cloudformation_stand_in, tmp_path):
+    type_names = ["AWS::Logs::LogGroup", "AWS::S3::Bucket", "AWS::SQS::Queue", "Foo::Bar::Baz"]
+    source = cloudformation_stand_in.source
+    source.schemas = {
+        name: json.dumps({"typeName": name, "primaryIdentifier": ["/properties/Name"]})
+        for name in type_names
+    }
+    source.versions = {name: "00000001" for name in type_names[:3]}
+    cloudformation_stand_in.page_size = 2
+    cloudformation = rs.schema_source(cloudformation_stand_in.endpoint_url)
+
+    result = rs.collect_schemas(cloudformation, type_names, str(tmp_path))
+    assert result["collected"] == type_names
+    assert result["changed"] is True
+    assert json.loads((tmp_path / "AWS_S3_Bucket.json").read_text())["primaryIdentifier"] == ["name"]
+
+    # only the types that are not listed by list-types are collected again
+    cloudformation_stand_in.calls = []
+    result = rs.collect_schemas(cloudformation, type_names, str(tmp_path))
+    assert result["collected"] == ["Foo::Bar::Baz"]
+    assert result["changed"] is False
+    assert cloudformation_stand_in.calls == ["Foo::Bar::Baz"]
+
+    source.versions["AWS::S3::Bucket"] = "00000002"
+    (tmp_path / "AWS_SQS_Queue.json").unlink()
+    result = rs.collect_schemas(cloudformation, type_names, str(tmp_path))
+    assert result["collected"] == ["AWS::S3::Bucket", "AWS::SQS::Queue", "Foo::Bar::Baz"]
+
+    result = rs.collect_schemas(cloudformation, type_names, str(tmp_path), force=True)
+    assert result["collected"] == type_names
+
+
+def test_DirectorySchemaSource(tmp_path):
+    source_dir = tmp_path / "source"
+    source_dir.mkdir()
+    type_names = [f"AWS::Service{i // 10}::Resource{i}" for i in range(300)]
+    for name in type_names:
+        (source_dir / (name.replace("::", "_") + ".json")).write_text(
+            json.dumps({"typeName": name, "primaryIdentifier": ["/properties/Id"]})
+        )
+    (source_dir / "schema_versions.json").write_text("{}")
+
+    with pytest.raises(TypeError):
+        g.SchemaSource()
+    source = rs.schema_source(str(source_dir))
+    assert isinstance(source, g.DirectorySchemaSource)
+    assert sorted(source.list_type_versions()) == sorted(type_names)
+    assert json.loads(source.generate_docs("AWS::Service0::Resource1"))["typeName"] == "AWS::Service0::Resource1"
+
+    schema_dir = tmp_path / "schemas"
+    schema_dir.mkdir()
+    result = rs.collect_schemas(source, type_names + ["AWS::Foo::Missing"], str(schema_dir))
+    assert result["collected"] == type_names
+    assert list(result["failed_resources"]) == ["AWS::Foo::Missing"]
+    assert json.loads((schema_dir / "AWS_Service29_Resource299.json").read_text())["primaryIdentifier"] == ["id"]
+
+    (source_dir / "AWS_Service3_Resource30.json").write_text(
+        json.dumps({"typeName": "AWS::Service3::Resource30", "primaryIdentifier": ["/properties/Arn"]})
+    )
+    result = rs.collect_schemas(source, type_names, str(schema_dir))
+    assert result["collected"] == ["AWS::Service3::Resource30"]
+    assert result["changed"] is True
@@ -235,10 +235,11 @@ def test_inject_content(tmp_path):
     module_dir.mkdir(parents=True)
     my_module = module_dir / "my_module.py"
     my_module.write_text(
-        "blabal\n"
+        "import os\n"
+        "DOCUMENTATION = 'blabal'\n"
         "EXAMPLES = r'''\n"
         "existing example\n'''\n"
-        "the end of the module\n"
+        "RETURN = 'the end of the module'\n"
     )
     extracted_example = {
         "foo.bar.my_module": {
@@ -250,16 +251,18 @@ def test_inject_content(tmp_path):
             ]
         }
     }
-    ge.inject(target_dir, extracted_example)
+    # the module is formatted, like the rendered modules
+    assert ge.inject(target_dir, extracted_example) == ["plugins/modules/my_module.py"]
     assert my_module.read_text() == (
-        "blabal\n"
-        "EXAMPLES = r'''\n"
+        'DOCUMENTATION = "blabal"\n'
+        'EXAMPLES = r"""\n'
         "- name: A good fit fo the EXAMPLEs block\n"
         "  foo.bar.my_module:\n"
         "    param: 1\n"
-        "'''\n"
-        "the end of the module\n"
+        '"""\n'
+        'RETURN = "the end of the module"\n'
     )
+    assert ge.inject(target_dir, extracted_example) == []
 
     my_module.write_text("blabal\n" "EXAMPLES = r'''\n" "existing example\n")
     with pytest.raises(ge.ContentInjectionFailure):
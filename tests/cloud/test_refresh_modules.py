@@ -10,6 +10,7 @@ from pathlib import Path
 import ansible_collections.ansible.content_builder.plugins.plugin_utils.cloud_utils.generator as g
 import ansible_collections.ansible.content_builder.plugins.action.generate_cloud_modules as rm
 import ansible_collections.ansible.content_builder.plugins.action.generate_cloud_schema as rs
+import ansible_collections.ansible.content_builder.plugins.plugin_utils.cloud_utils.utils as utils
 
 
 def resources(filepath):
@@ -195,3 +196,304 @@ def test_AnsibleModuleBaseAmazon_is_trusted():
     assert module.is_trusted(Path("tests/cloud/fixtures"))
     module.name = "something_we_dont_trust"
     assert not module.is_trusted(Path("tests/cloud/fixtures"))
+
+
+class FakeModule:
+    def __init__(self, name, fail=False):
+        self.name = name
+        self.fail = fail
+
+    def renderer(self, target_dir, **kwargs):
+        if self.fail:
+            raise ValueError(f"cannot render {self.name}")
+        Path(target_dir, self.name).write_text(self.name)
+
+
+def test_render_modules(tmp_path):
+    modules = [FakeModule("b"), FakeModule("a", fail=True), FakeModule("c")]
+    result = rm.render_modules(modules, target_dir=str(tmp_path))
+    assert result["modules"] == ["b", "c"]
+    assert list(result["failed_modules"]) == ["a"]
+    assert "cannot render a" in result["failed_modules"]["a"]
+
+
+def test_render_modules_with_workers(tmp_path):
+    modules = [FakeModule(f"module_{i}", fail=(i == 3)) for i in range(8)]
+    result = rm.render_modules(modules, workers=3, target_dir=str(tmp_path))
+    assert result["modules"] == [f"module_{i}" for i in range(8) if i != 3]
+    assert list(result["failed_modules"]) == ["module_3"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == result["modules"]
+
+
+def test_render_modules_profiling(tmp_path):
+    modules = [FakeModule(f"module_{i}") for i in range(4)]
+    for workers in (1, 3):
+        with rm.profiler.session() as profiler:
+            rm.render_modules(modules, workers=workers, target_dir=str(tmp_path))
+        assert sorted(profiler.report()["resources"]) == [m.name for m in modules]
+
+
+class FakeVersionedModule(FakeModule):
+    template_file = "default_module.j2"
+
+    def __init__(self, name, inputs):
+        super().__init__(name)
+        self.inputs = inputs
+
+    def build_inputs(self, target_dir, module_dir):
+        return self.inputs
+
+    def module_path(self, target_dir):
+        return Path(target_dir, self.name)
+
+
+def test_render_modules_incremental(tmp_path, mocker):
+    render_args = {
+        "target_dir": str(tmp_path),
+        "module_dir": "tests/cloud/fixtures",
+        "next_version": "1.0.0",
+        "role_path": "roles/module_openapi_cloud",
+    }
+    modules = [FakeVersionedModule("a", {"v": 1}), FakeVersionedModule("b", {"v": 1})]
+    result = rm.render_modules(modules, **render_args)
+    assert result["modules"] == ["a", "b"]
+    assert result["skipped_modules"] == []
+
+    spy = mocker.spy(FakeVersionedModule, "renderer")
+    modules[1].inputs = {"v": 2}
+    result = rm.render_modules(modules, **render_args)
+    assert result["modules"] == ["a", "b"]
+    assert result["skipped_modules"] == ["a"]
+    assert [call.args[0].name for call in spy.call_args_list] == ["b"]
+
+    # the output file has been removed
+    (tmp_path / "b").unlink()
+    result = rm.render_modules(modules, **render_args)
+    assert result["skipped_modules"] == ["a"]
+
+    result = rm.render_modules(modules, **dict(render_args, next_version="1.1.0"))
+    assert result["skipped_modules"] == []
+
+    result = rm.render_modules(modules, force=True, **dict(render_args, next_version="1.1.0"))
+    assert result["skipped_modules"] == []
+    assert spy.call_count == 6
+
+
+def vmware_resource():
+    resource = rm.Resource("vcenter_vm")
+    resource.operations = {
+        "create": (
+            "post",
+            "/api/vcenter/vm",
+            [{"name": "name", "in": "query", "type": "string", "required": True}],
+            {},
+        ),
+        "delete": (
+            "delete",
+            "/api/vcenter/vm/{vm}",
+            [{"name": "vm", "in": "path", "type": "string", "required": True}],
+            {},
+        ),
+    }
+    return resource
+
+
+def test_AnsibleModuleBaseVmware_parameters_cache(mocker):
+    module = rm.AnsibleModuleBaseVmware(vmware_resource(), definitions=rm.Definitions({}))
+    spy = mocker.spy(module, "_build_parameters")
+    parameters = module.parameters()
+    assert [p["name"] for p in parameters] == ["name", "state", "vm"]
+    assert module.parameters() is parameters
+    assert spy.call_count == 1
+
+    module.default_operationIds = {"delete"}
+    module.invalidate_parameters()
+    assert [p["name"] for p in module.parameters()] == ["state", "vm"]
+    assert spy.call_count == 2
+
+
+def test_Definitions_resolve():
+    definitions = rm.Definitions(
+        {
+            "error": {
+                "type": "object",
+                "properties": {
+                    "messages": {"$ref": "#/definitions/message"},
+                    "detail": {"$ref": "#/definitions/detail"},
+                },
+            },
+            "message": {
+                "type": "object",
+                "properties": {"params": {"$ref": "#/definitions/param"}},
+            },
+            "param": {
+                "type": "object",
+                "properties": {
+                    "nested": {"$ref": "#/definitions/message"},
+                    "id": {"$ref": "#/definitions/id", "description": "The id."},
+                },
+            },
+            "detail": {
+                "type": "object",
+                "properties": {
+                    "id": {"$ref": "#/definitions/id", "description": "The id."},
+                    "code": {"$ref": "#/definitions/code"},
+                },
+            },
+            "code": {"type": "object", "properties": {"value": {"type": "integer"}}},
+            "id": {"type": "string"},
+        }
+    )
+    # the references to the definitions of a cycle are never expanded
+    assert definitions.resolve("error") == {
+        "type": "object",
+        "properties": {
+            "messages": {"go_to": "message"},
+            "detail": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "string", "description": "The id."},
+                    "code": {"type": "object", "properties": {"value": {"type": "integer"}}},
+                },
+            },
+        },
+    }
+    assert definitions.flatten({"$ref": "#/definitions/param"}) == {"go_to": "param"}
+    assert definitions.resolve("param")["properties"]["nested"] == {"go_to": "message"}
+    assert definitions.is_cyclic("message")
+    assert not definitions.is_cyclic("detail")
+    # the order of resolution does not change the result
+    assert rm.Definitions(definitions.definitions).resolve("detail") == definitions.resolve("detail")
+
+    # the results can be modified without poisoning the cache
+    error = definitions.resolve("error")
+    error["properties"]["detail"]["properties"]["code"]["properties"]["value"]["type"] = "string"
+    error["properties"]["detail"]["properties"]["id"]["description"] = "Modified."
+    detail = definitions.flatten({"properties": {"detail": {"$ref": "#/definitions/detail"}}})
+    detail["properties"]["detail"]["properties"]["code"]["properties"].clear()
+    assert definitions.resolve("error") == rm.Definitions(definitions.definitions).resolve("error")
+    assert definitions.resolve("code") == {"type": "object", "properties": {"value": {"type": "integer"}}}
+    assert definitions.resolve("id") == {"type": "string"}
+    assert definitions.definitions["param"]["properties"]["id"] == {
+        "$ref": "#/definitions/id",
+        "description": "The id.",
+    }
+
+
+def test_SwaggerFile_load(tmp_path):
+    spec = {
+        "paths": {
+            "/api/vcenter/vm": {
+                "post": {
+                    "operationId": "create",
+                    "summary": "Creates a virtual machine.",
+                    "parameters": [{"in": "body", "name": "request_body", "schema": {"$ref": "#/definitions/vcenter.VM.create_spec"}}],
+                    "responses": {"201": {"description": "ID of newly-created virtual machine."}},
+                }
+            }
+        },
+        "definitions": {
+            "vcenter.VM.create_spec": {"type": "object", "properties": {"name": {"type": "string"}}},
+        },
+    }
+    spec_file = tmp_path / "vcenter.json"
+    spec_file.write_text(json.dumps(spec))
+
+    swagger_file = rm.SwaggerFile.load(spec_file)
+    expected = rm.SwaggerFile(spec_file.read_text())
+    assert list(swagger_file.paths) == ["/api/vcenter/vm"]
+    assert swagger_file.paths["/api/vcenter/vm"].operations == expected.paths["/api/vcenter/vm"].operations
+    assert swagger_file.definitions.resolve("vcenter.VM.create_spec") == expected.definitions.resolve(
+        "vcenter.VM.create_spec"
+    )
+
+
+def test_SwaggerFile_load_components(tmp_path):
+    spec = {
+        "paths": {
+            "/api/v1/server/Profiles": {
+                "post": {
+                    "operationId": "create",
+                    "summary": "Create a 'server.Profile' resource.",
+                    "parameters": [{"in": "body", "name": "body", "schema": {"$ref": "#/components/schemas/server.Profile"}}],
+                    "responses": {"200": {"description": "ok"}},
+                }
+            }
+        },
+        "components": {
+            "schemas": {
+                "server.Profile": {"type": "object", "properties": {"Name": {"$ref": "#/components/schemas/mo.Name"}}},
+                "mo.Name": {"type": "string", "description": "The name."},
+                "mo.Broken": {"type": "object", "properties": {"Tags": []}},
+            },
+        },
+    }
+    spec_file = tmp_path / "intersight_server.json"
+    spec_file.write_text(json.dumps(spec))
+    swagger_file = rm.SwaggerFile.load(spec_file, definitions="components")
+    assert swagger_file.definitions.resolve("schemas/server.Profile") == {
+        "type": "object",
+        "properties": {"Name": {"type": "string", "description": "The name."}},
+    }
+    # each schema is decoded on its own
+    schemas = swagger_file.definitions.definitions["schemas"]
+    assert isinstance(schemas, utils.LazyJSONObject)
+    assert sorted(schemas._decoded) == ["mo.Name", "server.Profile"]
+
+
+def test_SwaggerFile_snapshot(tmp_path, mocker):
+    spec = {
+        "paths": {
+            "/api/vcenter/vm": {
+                "get": {"operationId": "list", "summary": "List VMs.", "parameters": [], "responses": {}},
+            },
+            "/api/vcenter/vm/{vm}": {
+                "get": {"operationId": "get", "summary": "Get a VM.", "parameters": [], "responses": {}},
+                "delete": {"operationId": "delete", "summary": "Delete a VM.", "responses": {}},
+            },
+            "/api/vcenter/beta": {
+                "get": {"operationId": "list", "summary": "Technology Preview", "parameters": [], "responses": {}},
+            },
+        },
+        "definitions": {
+            "vcenter.VM": {"type": "object", "properties": {"parent": {"$ref": "#/definitions/vcenter.VM"}}},
+        },
+    }
+    spec["paths"]["/api/vcenter/vm/{vm}"]["get"]["responses"] = {"200": {"schema": {"$ref": "#/definitions/vcenter.VM"}}}
+    spec_file = tmp_path / "vcenter.json"
+    spec_file.write_text(json.dumps(spec))
+    cache_dir = tmp_path / "cache"
+    spy = mocker.spy(rm.SwaggerFile, "build_index")
+
+    swagger_file = rm.SwaggerFile.load(spec_file, cache_dir=cache_dir)
+    assert list(swagger_file.paths) == ["/api/vcenter/vm", "/api/vcenter/vm/{vm}"]
+    assert list(swagger_file.resources) == ["vcenter_vm"]
+    assert list(swagger_file.resources["vcenter_vm"].operations) == ["list", "get", "delete"]
+    assert spy.call_count == 1
+
+    snapshot = json.loads(utils.snapshot_path(spec_file, cache_dir).read_text())
+    # the $ref graph is resolved when the snapshot is compiled
+    assert snapshot["index"]["cyclic"] == {"vcenter.VM": True}
+    # only the mtime changed
+    os.utime(spec_file, ns=(0, 0))
+    cycles = mocker.spy(rm.Definitions, "_find_cycles")
+    cached = rm.SwaggerFile.load(spec_file, cache_dir=cache_dir)
+    assert spy.call_count == 1
+    assert cached.resources["vcenter_vm"].operations == swagger_file.resources["vcenter_vm"].operations
+    assert cached.resources["vcenter_vm"].summary == swagger_file.resources["vcenter_vm"].summary
+    assert cached.definitions.resolve("vcenter.VM") == {
+        "type": "object",
+        "properties": {"parent": {"go_to": "vcenter.VM"}},
+    }
+    assert cycles.call_count == 0
+
+    # the code building the index changed
+    mocker.patch.object(rm.SwaggerFile, "index_key", return_value="new")
+    rm.SwaggerFile.load(spec_file, cache_dir=cache_dir)
+    assert spy.call_count == 2
+
+    del spec["paths"]["/api/vcenter/vm/{vm}"]["delete"]
+    spec_file.write_text(json.dumps(spec))
+    updated = rm.SwaggerFile.load(spec_file, cache_dir=cache_dir)
+    assert spy.call_count == 3
+    assert list(updated.resources["vcenter_vm"].operations) == ["list", "get"]
@@ -1,6 +1,14 @@
 #!/usr/bin/env python3
 
-from ansible_collections.ansible.content_builder.plugins.plugin_utils.cloud_utils import utils
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+import yaml
+
+from ansible_collections.ansible.content_builder.plugins.plugin_utils.cloud_utils import module_blocks, utils
 
 
 def test_format_documentaion():
@@ -33,12 +41,122 @@ def test_format_documentaion():
     assert utils.format_documentation(input_arg) == output
 
 
+def _format_documentation_with_yaml_dumper(documentation):
+    # what format_documentation() used to do, with yaml.Dumper
+    class Dumper(yaml.Dumper):
+        def ignore_aliases(self, data):
+            return True
+
+    output = "r'''\n"
+    for key, value in documentation.items():
+        output += yaml.dump({key: value}, Dumper=Dumper, indent=4, default_flow_style=False)
+    return output + "'''"
+
+
+def test_format_documentation_dumper():
+    ignore_aliases = yaml.Dumper.ignore_aliases
+    shared = {"description": ["The name."], "type": "str"}
+    documentation = {
+        "module": "foo",
+        "short_description": "Manage foos",
+        "options": {"name": shared, "alias": shared},
+        "author": ["Someone (@someone)"],
+    }
+    output = utils.format_documentation(documentation)
+    assert output == (
+        "r'''\n"
+        "module: foo\n"
+        "short_description: Manage foos\n"
+        "options:\n"
+        "    alias:\n"
+        "        description:\n"
+        "        - The name.\n"
+        "        type: str\n"
+        "    name:\n"
+        "        description:\n"
+        "        - The name.\n"
+        "        type: str\n"
+        "author:\n"
+        "- Someone (@someone)\n"
+        "'''"
+    )
+    assert output == _format_documentation_with_yaml_dumper(documentation)
+    assert yaml.Dumper.ignore_aliases is ignore_aliases
+
+    # libyaml does not fold this one the same way, the Python emitter is used
+    documentation["options"]["label"] = {"description": ["Le libellé " + "très long " * 10], "type": "str"}
+    output = utils.format_documentation(documentation)
+    assert output == (
+        "r'''\n"
+        "module: foo\n"
+        "short_description: Manage foos\n"
+        "options:\n"
+        "    alias:\n"
+        "        description:\n"
+        "        - The name.\n"
+        "        type: str\n"
+        "    label:\n"
+        "        description:\n"
+        '        - "Le libell\\xE9 tr\\xE8s long tr\\xE8s long tr\\xE8s long tr\\xE8s long tr\\xE8\\\n'
+        '            s long tr\\xE8s long tr\\xE8s long tr\\xE8s long tr\\xE8s long tr\\xE8s long "\n'
+        "        type: str\n"
+        "    name:\n"
+        "        description:\n"
+        "        - The name.\n"
+        "        type: str\n"
+        "author:\n"
+        "- Someone (@someone)\n"
+        "'''"
+    )
+    assert output == _format_documentation_with_yaml_dumper(documentation)
+    assert yaml.safe_load(output[4:-3]) == documentation
+
+
 def test_indent():
     input_arg = "\nTest indentation.\n4 space should be added\n"
     output = "    \n    Test indentation.\n    4 space should be added\n    \n"
     assert utils.indent(input_arg, 4) == output
 
 
+def test_jinja2_renderer(tmp_path):
+    templates = tmp_path / "role" / "templates" / "module_directory" / "foo"
+    templates.mkdir(parents=True)
+    (templates / "module.j2").write_text("name = {{ name }}\n")
+    target_dir = tmp_path / "collection"
+
+    assert utils.jinja2_renderer("module.j2", tmp_path / "role", "foo", target_dir, name="bar") == "name = bar"
+    # the compiled template is cached in the target collection only
+    assert len(list((utils.get_cache_dir(target_dir) / "jinja2").iterdir())) == 1
+
+
+def test_format_argument_spec():
+    options = [
+        ("name", {"type": "str", "required": True}),
+        ("tags", {"type": "dict", "options": {"key": {"type": "str", "choices": ["a", "b's"]}}}),
+    ]
+    statements = utils.format_argument_spec(options)
+    assert statements == (
+        "\nargument_spec['name'] = {'type': 'str', 'required': True}"
+        "\nargument_spec['tags'] = {'type': 'dict', 'options': {'key': {'type': 'str', 'choices': ['a', \"b's\"]}}}"
+    )
+    argument_spec = {}
+    exec(statements, {"argument_spec": argument_spec})
+    assert argument_spec == dict(options)
+
+
+def test_camel_to_snake():
+    assert utils.camel_to_snake("TargetGroupARNs") == "target_group_arns"
+    assert utils.camel_to_snake("HTTPEndpoint") == "http_endpoint"
+    assert utils.camel_to_snake(["S3Bucket", "VpcId"]) == ["s3_bucket", "vpc_id"]
+    assert utils.camel_to_snake({"Tags": {"TagKey": 1}}) == {"tags": {"tag_key": 1}}
+    assert utils._camel_to_snake("VpcId", reversible=True) == "vpc_id"
+    assert utils._camel_to_snake("S3Bucket", reversible=True) == "s3_bucket"
+
+    hits = utils._camel_to_snake.cache_info().hits
+    assert utils.camel_to_snake("VpcId") == "vpc_id"
+    assert utils._camel_to_snake.cache_info().hits == hits + 1
+
+
 def test_python_type():
     assert utils.python_type("object") == "dict"
     assert utils.python_type("string") == "str"
@@ -47,3 +165,325 @@ def test_python_type():
     assert utils.python_type("boolean") == "bool"
     assert utils.python_type(["object", "string"]) == "dict"
     assert utils.python_type(["string", "object"]) == "str"
+
+
+def test_get_module_block():
+    content = (
+        "__metaclass__.x = type\n"
+        "a, b = 1, 2\n"
+        'DOCUMENTATION = r"""\nmodule: foo\noptions:\n  name: {}\n"""\n'
+        'EXAMPLES = """\n- foo:\n"""\n'
+        "RETURN = {}\n"
+        "def main():\n"
+        "    DOCUMENTATION = None\n"
+    )
+    assert module_blocks.get_module_block(content, "DOCUMENTATION") == (
+        "\nmodule: foo\noptions:\n  name: {}\n"
+    )
+    assert module_blocks.get_module_block(content, "EXAMPLES") == "\n- foo:\n"
+    assert module_blocks.get_module_block(content, "RETURN") is None
+    assert module_blocks.get_module_block(content, "METADATA") is None
+    assert utils.get_documentation_options(content) == ["name"]
+
+
+def test_get_module_block_python2():
+    content = 'DOCUMENTATION = """\noptions:\n  state: {}\n"""\nprint "foo"\n'
+    assert module_blocks.get_module_block(content, "DOCUMENTATION") == "\noptions:\n  state: {}\n"
+    with pytest.raises(SyntaxError):
+        module_blocks.get_module_block("DOCUMENTATION = (", "DOCUMENTATION")
+    assert utils.get_documentation_options("DOCUMENTATION = (") is None
+
+
+def test_filters_dependencies():
+    # the filters of the scaffolding roles do not load the generator dependencies
+    code = (
+        "import sys\n"
+        "from ansible_collections.ansible.content_builder.plugins.filter import get_doc, get_example\n"
+        "print(sorted({'autoflake', 'black', 'cProfile', 'jinja2', 'yaml'} & set(sys.modules)))\n"
+    )
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    process = subprocess.run(
+        [sys.executable, "-c", code], env=env, check=True, capture_output=True, text=True
+    )
+    assert process.stdout == "[]\n"
+
+
+def test_ModuleConfig(tmp_path):
+    modules_yaml = tmp_path / "modules.yaml"
+    modules_yaml.write_text(
+        "- s3_bucket:\n"
+        "    documentation:\n"
+        "      short_description: Create and manage S3 buckets\n"
+        "- logs_log_group:\n"
+    )
+    config = utils.ModuleConfig.load(tmp_path)
+    assert utils.ModuleConfig.load(tmp_path) is config
+    assert "s3_bucket" in config
+    assert config.get("logs_log_group") == {}
+    assert config.get("s3_bucket") == {
+        "documentation": {"short_description": "Create and manage S3 buckets"}
+    }
+    with pytest.raises(KeyError):
+        config.get("iam_role")
+
+    modules_yaml.write_text("- iam_role:\n")
+    stat = modules_yaml.stat()
+    os.utime(modules_yaml, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+    config = utils.ModuleConfig.load(tmp_path)
+    assert config.entries == [{"iam_role": None}]
+    assert "s3_bucket" not in config
+
+
+def test_get_module_added_ins(tmp_path):
+    def git(*args):
+        subprocess.run(
+            ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+            cwd=tmp_path,
+            check=True,
+            capture_output=True,
+        )
+
+    def write_module(name, options):
+        module_dir = tmp_path / "plugins" / "modules"
+        module_dir.mkdir(parents=True, exist_ok=True)
+        documentation = yaml.safe_dump({"module": name, "options": {o: {"type": "str"} for o in options}})
+        (module_dir / f"{name}.py").write_text(f"DOCUMENTATION = r'''\n{documentation}'''\n")
+
+    git("init", "-q")
+    write_module("s3_bucket", ["bucket_name"])
+    git("add", "-A")
+    git("commit", "-q", "-m", "first")
+    git("tag", "1.0.0")
+    write_module("s3_bucket", ["bucket_name", "tags"])
+    write_module("logs_log_group", ["log_group_name"])
+    git("add", "-A")
+    git("commit", "-q", "-m", "second")
+    git("tag", "1.1.0-rc1")
+    git("tag", "1.1.0")
+
+    git_dir = tmp_path / ".git"
+    assert utils.get_module_added_ins("s3_bucket", git_dir) == {
+        "module": "1.0.0",
+        "options": {"bucket_name": "1.0.0", "tags": "1.1.0"},
+    }
+    assert utils.get_module_added_ins("logs_log_group", git_dir) == {
+        "module": "1.1.0",
+        "options": {"log_group_name": "1.1.0"},
+    }
+    assert utils.get_module_added_ins("iam_role", git_dir) == {
+        "module": None,
+        "options": {},
+    }
+
+
+def test_get_modules_by_tag_cache(tmp_path, mocker):
+    def git(*args):
+        return subprocess.run(
+            ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+            cwd=tmp_path,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+
+    module_file = tmp_path / "plugins" / "modules" / "s3_bucket.py"
+    module_file.parent.mkdir(parents=True)
+    module_file.write_text("DOCUMENTATION = '''\noptions:\n  name: {}\n'''\n")
+    git("init", "-q")
+    git("add", "-A")
+    git("commit", "-q", "-m", "first")
+    git("tag", "1.0.0")
+
+    git_dir = str(tmp_path / ".git")
+    cache_file = str(tmp_path / ".cache" / "version_added.json")
+    spy = mocker.spy(utils, "get_documentation_options")
+    assert utils.get_modules_by_tag(git_dir, cache_file) == {"1.0.0": {"s3_bucket": ["name"]}}
+    assert spy.call_count == 1
+    assert utils.get_modules_by_tag(git_dir, cache_file) == {"1.0.0": {"s3_bucket": ["name"]}}
+    assert spy.call_count == 1
+
+    # the tag is moved to a new commit
+    module_file.write_text("DOCUMENTATION = '''\noptions:\n  name: {}\n  tags: {}\n'''\n")
+    git("commit", "-q", "-a", "-m", "second")
+    git("tag", "-f", "1.0.0")
+    assert utils.get_modules_by_tag(git_dir, cache_file) == {
+        "1.0.0": {"s3_bucket": ["name", "tags"]}
+    }
+    assert spy.call_count == 2
+
+
+def test_write_if_changed(tmp_path):
+    target = tmp_path / "plugins" / "modules" / "foo.py"
+    assert utils.write_if_changed(target, "a") is True
+    mtime = target.stat().st_mtime_ns
+    assert utils.write_if_changed(target, "a") is False
+    assert target.stat().st_mtime_ns == mtime
+    assert utils.write_if_changed(target, "b") is True
+    assert target.read_text() == "b"
+    assert [p.name for p in target.parent.iterdir()] == ["foo.py"]
+
+
+def test_OutputFiles(tmp_path):
+    (tmp_path / "meta").mkdir()
+    (tmp_path / "meta" / "runtime.yml").write_text("---\n")
+    output = utils.OutputFiles(tmp_path)
+    output.write(tmp_path / "meta" / "runtime.yml", "---\n")
+    with output.open(tmp_path / "tests" / "sanity" / "ignore-2.15.txt") as f:
+        f.write("plugins/modules/foo.py pep8!skip\n")
+    assert output.changed == ["tests/sanity/ignore-2.15.txt"]
+
+    (tmp_path / "plugins").mkdir()
+    output.write(tmp_path / "plugins" / "foo.py", "import os\nfoo = 'bar'\n")
+    assert (tmp_path / "plugins" / "foo.py").read_text() == 'foo = "bar"\n'
+    assert output.write(tmp_path / "plugins" / "foo.py", "foo = 'bar'") is False
+    assert output.changed == ["tests/sanity/ignore-2.15.txt", "plugins/foo.py"]
+
+
+def test_format_python(tmp_path):
+    content = "import os\nimport re\nre.compile( 'a' )\nfoo = [\n'aaaaaaaaaaaaaaaaaaaa', 'bbbbbbbbbbbbbbbbbbbb']\n"
+    assert utils.format_python(content, tmp_path) == (
+        'import re\n\nre.compile("a")\nfoo = ["aaaaaaaaaaaaaaaaaaaa", "bbbbbbbbbbbbbbbbbbbb"]\n'
+    )
+
+    collection = tmp_path / "collection"
+    collection.mkdir()
+    (collection / "pyproject.toml").write_text(
+        "[tool.black]\nline-length = 40\nskip-string-normalization = true\n"
+    )
+    assert utils.format_python(content, collection) == (
+        "import re\n\nre.compile('a')\nfoo = [\n    'aaaaaaaaaaaaaaaaaaaa',\n    'bbbbbbbbbbbbbbbbbbbb',\n]\n"
+    )
+
+
+def test_LazyJSONObject(tmp_path):
+    content = {
+        "swagger": "2.0",
+        "paths": {"/api/vcenter/vm": {"get": {"summary": "Liste des VMs, très utile"}}},
+        "definitions": {
+            "vcenter.VM": {"type": "object", "properties": {"name": {"type": "string"}}},
+            "vcenter.empty": {},
+            "vcenter.é": [1, 2.5, None, True, "ü"],
+        },
+        "empty": {},
+    }
+    spec_file = tmp_path / "spec.json"
+    spec_file.write_text(json.dumps(content, indent=2, ensure_ascii=False))
+
+    lazy = utils.LazyJSONObject.load(spec_file)
+    assert list(lazy) == list(content)
+    assert isinstance(lazy["definitions"], utils.LazyJSONObject)
+    assert lazy["definitions"]["vcenter.VM"] is lazy["definitions"]["vcenter.VM"]
+    assert json.loads(json.dumps({k: dict(v) if isinstance(v, utils.Mapping) else v for k, v in lazy.items()})) == content
+    with pytest.raises(KeyError):
+        lazy["definitions"]["vcenter.missing"]
+
+    spec_file.write_text('{"paths": {"a": 1,}}')
+    with pytest.raises(json.JSONDecodeError):
+        utils.LazyJSONObject.load(spec_file)
+
+
+def test_load_schema(tmp_path, mocker):
+    content = {
+        "typeName": "AWS::Logs::LogGroup",
+        "properties": {"LogGroupName": {"type": "string", "description": "Le nom du groupe"}},
+        "primaryIdentifier": ["/properties/LogGroupName"],
+    }
+    schema_file = tmp_path / "AWS_Logs_LogGroup.json"
+    schema_file.write_text(json.dumps(content, ensure_ascii=False))
+    cache_dir = tmp_path / "cache"
+    spy = mocker.spy(utils, "compile_schema")
+
+    schema, index = utils.load_schema(schema_file, depth=1, indexer=lambda c: sorted(c), index_key=1)
+    assert dict(schema) == content
+    assert index == ["primaryIdentifier", "properties", "typeName"]
+    assert spy.call_count == 0
+
+    schema, index = utils.load_schema(
+        schema_file, depth=1, indexer=lambda c: sorted(c), index_key=1, cache_dir=cache_dir
+    )
+    assert dict(schema) == content
+    assert index == ["primaryIdentifier", "properties", "typeName"]
+    snapshot = utils.snapshot_path(schema_file, cache_dir)
+    assert snapshot.parent.parent == cache_dir
+    assert not list(tmp_path.glob("*.snapshot*"))
+    # only data, with the offsets of the members in the JSON file
+    header = json.loads(snapshot.read_text())
+    start, end = header["members"]["properties"]
+    assert json.loads(schema_file.read_bytes()[start:end]) == content["properties"]
+
+    schema, index = utils.load_schema(
+        schema_file, depth=1, indexer=lambda c: sorted(c), index_key=1, cache_dir=cache_dir
+    )
+    assert dict(schema) == content
+    assert spy.call_count == 1
+
+    # the snapshot does not match the depth or the index anymore
+    assert dict(utils.load_schema(schema_file, depth=1, cache_dir=cache_dir)[0]) == content
+    assert spy.call_count == 2
+
+    content["properties"]["LogGroupName"]["type"] = "str"
+    schema_file.write_text(json.dumps(content))
+    assert dict(utils.load_schema(schema_file, depth=1, cache_dir=cache_dir)[0]) == content
+    assert spy.call_count == 3
+
+    snapshot.write_text("garbage")
+    assert dict(utils.load_schema(schema_file, depth=1, cache_dir=cache_dir)[0]) == content
+    assert spy.call_count == 4
+
+    # only the mtime changes, the file is hashed once and the snapshot is kept
+    os.utime(schema_file, ns=(1, 1))
+    sha256 = mocker.spy(utils, "file_sha256")
+    assert dict(utils.load_schema(schema_file, depth=1, cache_dir=cache_dir)[0]) == content
+    assert dict(utils.load_schema(schema_file, depth=1, cache_dir=cache_dir)[0]) == content
+    assert sha256.call_count == 1
+    assert spy.call_count == 4
+    assert json.loads(snapshot.read_text())["source"]["mtime_ns"] == 1
+
+    not_a_dir = tmp_path / "not_a_dir"
+    not_a_dir.write_text("")
+    with pytest.warns(UserWarning, match="Cannot write the snapshot"):
+        schema, _ = utils.load_schema(schema_file, depth=1, cache_dir=not_a_dir)
+    assert dict(schema) == content
+
+
+def test_Profiler():
+    profiler = utils.Profiler()
+    with profiler.stage("spec load"):
+        pass
+    assert profiler.report() == {"stages": {}, "resources": {}}
+
+    with profiler.session():
+        with profiler.stage("spec load"):
+            pass
+        with profiler.resource("s3_bucket"):
+            with profiler.stage("doc build"):
+                pass
+            with profiler.stage("doc build"):
+                pass
+        profiler.merge("ec2_vpc", {"doc build": 1.0, "total": 2.0})
+    report = profiler.report()
+    assert sorted(report["stages"]) == ["doc build", "spec load", "total"]
+    assert report["stages"]["doc build"] >= 1.0
+    assert report["stages"]["total"] < 1.0
+    assert sorted(report["resources"]["s3_bucket"]) == ["doc build", "total"]
+    assert report["resources"]["ec2_vpc"] == {"doc build": 1.0, "total": 2.0}
+    assert not profiler.enabled
+
+
+def test_profiling(tmp_path, monkeypatch):
+    result = {}
+    with utils.profiling({}, result) as profiler:
+        assert not profiler.enabled
+    assert result == {}
+
+    monkeypatch.setenv("CONTENT_BUILDER_PROFILE", "yes")
+    with utils.profiling({}, result) as profiler:
+        with profiler.stage("write"):
+            pass
+    assert sorted(result["profile"]["stages"]) == ["total", "write"]
+
+    profile_file = str(tmp_path / "generate.pstats")
+    with utils.profiling({"profile": False, "profile_file": profile_file}, result):
+        utils.camel_to_snake("TargetGroupARNs")
+    assert result["profile"]["profile_file"] == profile_file
+    assert os.path.getsize(profile_file) > 0